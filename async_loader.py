@@ -0,0 +1,237 @@
+import asyncio
+import csv
+from datetime import datetime
+from find_open_restaurants import (
+    load_restaurants,
+    open_restaurants,
+    parse_restaurant
+)
+
+
+async def _read_rows(csv_filename, chunk_size, queue, n_workers):
+    loop = asyncio.get_running_loop()
+
+    # Every blocking file operation runs in the default executor so the
+    # parsing workers keep the event loop busy while a read is stalled
+    f = await loop.run_in_executor(
+        None,
+        lambda: open(csv_filename, newline="")
+    )
+
+    try:
+        row_number = 0
+        tail = ""
+
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, chunk_size)
+            if chunk == "":
+                break
+
+            text = tail + chunk
+
+            # Hold back everything after the last "\n" until the next chunk
+            # arrives. Splitting on "\n" alone keeps a "\r\n" that straddles
+            # two reads together, and leaves characters splitlines() would
+            # also break on (\x0b, \u2028, ...) inside their fields. Rows
+            # are assumed not to contain quoted line breaks.
+            end = text.rfind("\n") + 1
+            tail = text[end:]
+            lines = text[:end].split("\n")[:-1]
+
+            batch = []
+            for entry in csv.reader(lines):
+                batch.append((row_number, entry))
+                row_number += 1
+
+            if batch:
+                await queue.put(batch)
+
+        if tail:
+            for entry in csv.reader([tail]):
+                await queue.put([(row_number, entry)])
+                row_number += 1
+    finally:
+        await loop.run_in_executor(None, f.close)
+
+    # One sentinel per worker. Only once every row is queued: after a
+    # failure the workers are cancelled, and a put into a full queue
+    # nobody drains would never return.
+    for _ in range(n_workers):
+        await queue.put(None)
+
+
+def _parse_batch(batch):
+    return [
+        (row_number, parse_restaurant(entry[0], entry[1]))
+        for (row_number, entry) in batch
+    ]
+
+
+async def _parse_rows(queue, parsed, executor):
+    loop = asyncio.get_running_loop()
+
+    while True:
+        batch = await queue.get()
+        if batch is None:
+            return
+
+        # Parsing is CPU-bound, so it runs in the executor rather than
+        # holding up the event loop
+        parsed.update(
+            await loop.run_in_executor(executor, _parse_batch, batch)
+        )
+
+
+async def load_restaurants_async(
+    csv_filename,
+    chunk_size=64*1024,
+    n_workers=2,
+    queue_size=8,
+    executor=None
+):
+    # executor parses the batches: the loop's default thread pool unless
+    # given, or e.g. a ProcessPoolExecutor to parse on several cores
+    queue = asyncio.Queue(maxsize=queue_size)
+    parsed = {}
+
+    reader = asyncio.create_task(
+        _read_rows(csv_filename, chunk_size, queue, n_workers)
+    )
+    workers = [
+        asyncio.create_task(_parse_rows(queue, parsed, executor))
+        for _ in range(n_workers)
+    ]
+
+    try:
+        await asyncio.gather(reader, *workers)
+    except BaseException:
+        for task in [reader, *workers]:
+            task.cancel()
+        # Wait for them to wind down, so none outlives the load
+        await asyncio.gather(reader, *workers, return_exceptions=True)
+        raise
+
+    # Restore CSV order regardless of which worker parsed each row
+    return [parsed[row_number] for row_number in sorted(parsed)]
+
+
+async def find_open_restaurants_async(csv_filename, search_datetime):
+    restaurants = await load_restaurants_async(csv_filename)
+    return open_restaurants(restaurants, search_datetime)
+
+
+def _test_load_restaurants_async():
+    import os
+    import tempfile
+
+    csv_filename = "rest_hours.csv"
+    expected = load_restaurants(csv_filename)
+
+    # Chunk sizes small enough to split rows across reads
+    for chunk_size in [1, 37, 64*1024]:
+        for n_workers in [1, 4]:
+            restaurants = asyncio.run(
+                load_restaurants_async(
+                    csv_filename,
+                    chunk_size=chunk_size,
+                    n_workers=n_workers,
+                    queue_size=2
+                )
+            )
+            assert restaurants == expected
+
+    # csv.writer ends rows with "\r\n", which odd chunk sizes split
+    # between reads; names may hold characters splitlines() breaks on
+    with open(csv_filename, newline="") as f:
+        rows = list(csv.reader(f))
+    rows[0][0] = "Caf\u2028e \x0b Bar"
+
+    (fd, crlf_filename) = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+        expected = load_restaurants(crlf_filename)
+        assert expected[0]["name"] == rows[0][0]
+
+        for chunk_size in [1, 7, 64*1024]:
+            restaurants = asyncio.run(
+                load_restaurants_async(crlf_filename, chunk_size=chunk_size)
+            )
+            assert restaurants == expected
+    finally:
+        os.remove(crlf_filename)
+
+
+def _test_load_restaurants_async_executor():
+    from concurrent.futures import ProcessPoolExecutor
+
+    csv_filename = "rest_hours.csv"
+
+    with ProcessPoolExecutor(2) as executor:
+        restaurants = asyncio.run(
+            load_restaurants_async(
+                csv_filename,
+                chunk_size=512,
+                executor=executor
+            )
+        )
+    assert restaurants == load_restaurants(csv_filename)
+
+
+def _test_load_restaurants_async_failure():
+    import os
+    import tempfile
+
+    # A bad row fails its worker while the reader is still queueing rows.
+    # The load must fail rather than hang on a queue nobody drains, and
+    # leave no tasks behind.
+    async def load_fails(filename, n_workers):
+        try:
+            await asyncio.wait_for(
+                load_restaurants_async(
+                    filename,
+                    chunk_size=16,
+                    n_workers=n_workers,
+                    queue_size=1
+                ),
+                10
+            )
+            assert False, "A bad row should fail the load"
+        except AssertionError as e:
+            assert e.args == ()
+
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    (fd, bad_filename) = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            f.write('"Broken Grill","Mon Banana"\n')
+            with open("rest_hours.csv", newline="") as rest_hours:
+                f.write(rest_hours.read())
+
+        for n_workers in [1, 4]:
+            asyncio.run(load_fails(bad_filename, n_workers))
+    finally:
+        os.remove(bad_filename)
+
+
+def _test_find_open_restaurants_async():
+    csv_filename = "rest_hours.csv"
+    search_datetime = datetime(2020, 11, 14, 13, 45)
+
+    expected = open_restaurants(
+        load_restaurants(csv_filename),
+        search_datetime
+    )
+    found = asyncio.run(
+        find_open_restaurants_async(csv_filename, search_datetime)
+    )
+    assert found == expected
+
+
+if __name__ == "__main__":
+    _test_load_restaurants_async()
+    _test_load_restaurants_async_executor()
+    _test_load_restaurants_async_failure()
+    _test_find_open_restaurants_async()
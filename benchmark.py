@@ -0,0 +1,411 @@
+import os
+import subprocess
+import sys
+import time
+
+
+# Cold-start budgets. Generous enough to absorb machine noise, tight enough
+# to catch an eager import of a heavy module.
+IMPORT_TIME_BUDGET_US = 15000
+CLI_COLD_START_BUDGET_S = 0.5
+
+# Modules that must stay deferred until the CLI actually needs them
+DEFERRED_MODULES = [
+    "argparse",
+    "cProfile",
+    "calendar",
+    "csv",
+    "datetime",
+    "pathlib",
+    "pstats",
+    "sqlite3",
+    "string",
+    "tempfile",
+    "threading",
+    "tracemalloc"
+]
+
+REPEATS = 5
+
+# Crafted "Mon, Mon, Mon, ..." day lists of increasing length, from about
+# 250 characters to 256k, long enough that slicing the rest of the input
+# on every step would show as a steep slope
+WORST_CASE_DAY_COUNTS = [50, 200, 800, 3200, 12800, 51200]
+# How far time per character may drift from the shortest to the longest
+# input before parsing counts as superlinear
+LINEARITY_TOLERANCE = 2.0
+# A time budget must stop a crafted string of this many days this quickly
+BUDGET_DAY_COUNT = 250000
+BUDGET_SECONDS = 0.001
+BUDGET_OVERSHOOT_SECONDS = 0.005
+
+# Partner-feed spellings, which must not slow down the common format
+EXTENDED_FORMATS = [
+    "Mon-Sun 24 hours  / Closed Tue",
+    "Mon\u2013Fri noon \u2013 midnight / Sat 9 am \u2013 5 pm",
+    "24 hours",
+    "Closed Mon  / Tue-Sun 11 am - 10 pm"
+]
+# Most a parse may cost, measured in runs of _reference_scan() over the
+# same strings, so the gate holds on fast and slow machines alike. About
+# 1.4x what a parse costs today.
+MAX_PARSE_COST_IN_SCANS = {
+    "parse": 50,
+    "generated parse": 20,
+    "parse, extended formats": 38
+}
+
+# Schedule memory is measured on a sample of the catalogue repeated, then
+# projected to the catalogue size we plan for
+MEMORY_SAMPLE_SIZE = 20000
+PROJECTED_CATALOGUE_SIZE = 1000000
+
+
+def _cold_start_env():
+    # Cold starts in production load cached bytecode, so make sure it is
+    # written even if this shell disables it
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _import_times(module):
+    import site
+
+    # -I -S: no site, .pth files or sitecustomize, so every module in the
+    # output was imported by the module itself. The source directory and
+    # site-packages are put on the path by hand instead.
+    paths = [os.getcwd()] + site.getsitepackages()
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-I",
+            "-S",
+            "-X",
+            "importtime",
+            "-c",
+            "import sys; sys.path[:0] = {!r}; import {}".format(paths, module)
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=_cold_start_env()
+    )
+
+    # Lines look like "import time:  self | cumulative | name"
+    cumulative_us = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        fields = line[len("import time:"):].split("|")
+        if not fields[1].strip().isdigit():
+            continue  # Header line
+
+        cumulative_us[fields[2].strip()] = int(fields[1])
+
+    return cumulative_us
+
+
+def benchmark_import_time(module="find_open_restaurants"):
+    _import_times(module)  # Warm the bytecode cache
+    runs = [_import_times(module) for _ in range(REPEATS)]
+    best_us = min(run[module] for run in runs)
+    eager = [name for name in DEFERRED_MODULES if name in runs[0]]
+
+    print("import {}: {} us (budget {} us)".format(
+        module,
+        best_us,
+        IMPORT_TIME_BUDGET_US
+    ))
+    if eager:
+        print("  imported eagerly: " + ", ".join(eager))
+
+    return best_us <= IMPORT_TIME_BUDGET_US and not eager
+
+
+def benchmark_cli_cold_start():
+    best_s = None
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        subprocess.run(
+            [
+                sys.executable,
+                "find_open_restaurants.py",
+                "rest_hours.csv",
+                "--at",
+                "2020-11-14T13:45"
+            ],
+            stdout=subprocess.DEVNULL,
+            check=True,
+            env=_cold_start_env()
+        )
+        elapsed = time.perf_counter() - start
+
+        if best_s is None or elapsed < best_s:
+            best_s = elapsed
+
+    print("CLI cold start: {:.3f} s (budget {:.3f} s)".format(
+        best_s,
+        CLI_COLD_START_BUDGET_S
+    ))
+
+    return best_s <= CLI_COLD_START_BUDGET_S
+
+
+def _crafted_day_list(n_days):
+    return "Mon" + ", Mon"*(n_days - 1) + " 9 am - 5 pm"
+
+
+def _best_seconds(function, *args):
+    best_s = None
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+
+        if best_s is None or elapsed < best_s:
+            best_s = elapsed
+
+    return best_s
+
+
+def benchmark_worst_case_parse():
+    from open_hours_parser import (
+        BUDGET_EXCEEDED,
+        ParseBudget,
+        parse
+    )
+
+    steps_per_char = []
+    us_per_char = []
+
+    for n_days in WORST_CASE_DAY_COUNTS:
+        input = _crafted_day_list(n_days)
+        budget = ParseBudget()
+        best_s = _best_seconds(parse, input, budget)
+
+        steps_per_char.append(budget.steps / len(input))
+        us_per_char.append(best_s*1e6 / len(input))
+
+        print("worst-case parse, {} chars: {} steps, {:.2f} us/char".format(
+            len(input),
+            budget.steps,
+            us_per_char[-1]
+        ))
+
+    linear = (
+        # Steps are exact; the slack is the fixed cost of the hours after
+        # the day list, which weighs more on short inputs
+        max(steps_per_char) / min(steps_per_char) <= 1.1
+        and max(us_per_char) / min(us_per_char) <= LINEARITY_TOLERANCE
+    )
+
+    input = _crafted_day_list(BUDGET_DAY_COUNT)
+    start = time.perf_counter()
+    result = parse(input, ParseBudget(max_seconds=BUDGET_SECONDS))
+    elapsed = time.perf_counter() - start
+
+    print("budgeted parse, {} chars: stopped after {:.4f} s".format(
+        len(input),
+        elapsed
+    ))
+
+    guarded = (
+        result is BUDGET_EXCEEDED
+        and elapsed <= BUDGET_OVERSHOOT_SECONDS
+    )
+
+    return linear and guarded
+
+
+def _catalogue_pieces(csv_filename="rest_hours.csv"):
+    import csv
+    import re
+
+    with open(csv_filename, newline="") as f:
+        hours_strings = [entry[1] for entry in csv.reader(f)]
+
+    days = []
+    times = []
+    for hours_string in hours_strings:
+        for segment in hours_string.split("  / "):
+            if match := re.match(r"(.*?) (\d.*) - (.*)", segment):
+                days.append(match.group(1))
+                times += [match.group(2), match.group(3)]
+
+    return (hours_strings, days, times)
+
+
+def _reference_scan(input):
+    # A fixed tokenizer in plain Python, the yardstick parse throughput is
+    # gated against. It runs the same kind of bytecode as the parsers, so
+    # a faster or slower machine speeds both up alike.
+    tokens = []
+    token = ""
+
+    for c in input:
+        if c in " ,-/:":
+            if token:
+                tokens.append(token)
+                token = ""
+        else:
+            token += c
+
+    if token:
+        tokens.append(token)
+
+    return tokens
+
+
+def _parses_per_second(parser, inputs, rounds=20):
+    # Also returns how many _reference_scan() runs one parse costs. The two
+    # are timed back to back in every repeat, so load on the machine hits
+    # both.
+    best_s = None
+    best_scan_s = None
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for input in inputs:
+                parser(input)
+        elapsed = time.perf_counter() - start
+
+        if best_s is None or elapsed < best_s:
+            best_s = elapsed
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for input in inputs:
+                _reference_scan(input)
+        elapsed = time.perf_counter() - start
+
+        if best_scan_s is None or elapsed < best_scan_s:
+            best_scan_s = elapsed
+
+    return (rounds*len(inputs) / best_s, best_s / best_scan_s)
+
+
+def benchmark_parser_throughput():
+    import generated_parser
+    import open_hours_parser
+
+    (hours_strings, days, times) = _catalogue_pieces()
+
+    fast_enough = True
+    for (name, parser, inputs) in [
+        ("_time", open_hours_parser._time, times),
+        ("_days", open_hours_parser._days, days),
+        ("parse", open_hours_parser.parse, hours_strings),
+        ("generated parse", generated_parser.parse, hours_strings),
+        ("parse, extended formats", open_hours_parser.parse, EXTENDED_FORMATS)
+    ]:
+        (rate, cost_in_scans) = _parses_per_second(parser, inputs)
+
+        print("{}: {:.0f} parses/sec, {:.1f} scans/parse".format(
+            name,
+            rate,
+            cost_in_scans
+        ))
+
+        # The primitives are reported, not gated
+        if name in MAX_PARSE_COST_IN_SCANS:
+            fast_enough = fast_enough and (
+                cost_in_scans <= MAX_PARSE_COST_IN_SCANS[name]
+            )
+
+    return fast_enough
+
+
+def _traced_bytes(build):
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    del kept
+    return after - before
+
+
+def benchmark_schedule_memory():
+    from find_open_restaurants import load_restaurants
+    from modular_datetime import compress_hours, pack_hours
+
+    restaurants = load_restaurants("rest_hours.csv")
+    hours_strings = [
+        restaurants[i % len(restaurants)]["hours_string"]
+        for i in range(MEMORY_SAMPLE_SIZE)
+    ]
+
+    def parsed():
+        from open_hours_parser import parse
+        return [parse(hours_string)[0] for hours_string in hours_strings]
+
+    schedules = parsed()
+    for (name, build) in [
+        ("Mod dicts", parsed),
+        ("uint16 pairs", lambda: [pack_hours(hours) for hours in schedules]),
+        (
+            "uint16 day-mask records",
+            lambda: [compress_hours(hours) for hours in schedules]
+        )
+    ]:
+        per_restaurant = _traced_bytes(build) / MEMORY_SAMPLE_SIZE
+        print("{}: {:.0f} bytes per restaurant, {:.0f} MB for {}".format(
+            name,
+            per_restaurant,
+            per_restaurant*PROJECTED_CATALOGUE_SIZE / 1e6,
+            PROJECTED_CATALOGUE_SIZE
+        ))
+
+    # One flat array for the whole catalogue drops the per-array overhead
+    for (name, pack) in [
+        ("uint16 pairs", pack_hours),
+        ("uint16 day-mask records", compress_hours)
+    ]:
+        per_restaurant = sum(
+            len(packed)*packed.itemsize
+            for packed in map(pack, schedules)
+        ) / MEMORY_SAMPLE_SIZE
+        print("{}, one flat array: {:.0f} MB for {}".format(
+            name,
+            per_restaurant*PROJECTED_CATALOGUE_SIZE / 1e6,
+            PROJECTED_CATALOGUE_SIZE
+        ))
+
+    # Reported, not gated
+    return True
+
+
+def main():
+    benchmarks = [
+        benchmark_import_time,
+        benchmark_cli_cold_start,
+        benchmark_worst_case_parse,
+        benchmark_parser_throughput,
+        benchmark_schedule_memory
+    ]
+
+    failed = [
+        benchmark.__name__
+        for benchmark in benchmarks
+        if not benchmark()
+    ]
+
+    if failed:
+        print("Regressed: " + ", ".join(failed))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
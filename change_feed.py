@@ -0,0 +1,202 @@
+import asyncio
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from find_open_restaurants import load_restaurants
+
+
+SECONDS_PER_WEEK = 7*24*60*60
+
+OPENED = "opened"
+CLOSED = "closed"
+
+
+def _is_open(intervals, seconds):
+    # datetime_in_range on plain seconds
+    return any(
+        (seconds - open_s) % SECONDS_PER_WEEK
+        < (close_s - open_s) % SECONDS_PER_WEEK
+        for (open_s, close_s) in intervals
+    )
+
+
+def weekly_timeline(restaurants):
+    # Every change of a restaurant's state in a week, as (seconds since
+    # Monday 00:00, event, name), in order; closings sort before openings
+    # at the same moment. Overlapping ranges of one restaurant only count
+    # as one opening and one closing.
+    timeline = []
+
+    for rest in restaurants:
+        intervals = [
+            (
+                int(hour_range["open_datetime"]),
+                int(hour_range["close_datetime"])
+            )
+            for hour_range in rest["hours_datetimes"]
+        ]
+        boundaries = sorted({
+            seconds
+            for interval in intervals
+            for seconds in interval
+        })
+        if not boundaries:
+            continue
+
+        # State only changes at boundaries, so compare each with the one
+        # before it, wrapping round the week
+        states = [_is_open(intervals, seconds) for seconds in boundaries]
+        for (i, seconds) in enumerate(boundaries):
+            if states[i] != states[i - 1]:
+                timeline.append(
+                    (seconds, OPENED if states[i] else CLOSED, rest["name"])
+                )
+
+    # "closed" < "opened", so closings come first
+    timeline.sort()
+    return timeline
+
+
+def _week_start(moment):
+    return datetime.combine(
+        moment.date() - timedelta(days=moment.weekday()),
+        datetime.min.time(),
+        moment.tzinfo
+    )
+
+
+def change_feed(timeline, start_datetime):
+    # Yields (datetime, name, event) for every change after start_datetime,
+    # forever, repeating the timeline every week. Changes at start_datetime
+    # itself are already in what find_open_restaurants returns for it, so
+    # are left out. Ends at once if nothing ever changes.
+    if not timeline:
+        return
+
+    week_start = _week_start(start_datetime)
+    offset = (start_datetime - week_start).total_seconds()
+    # bisect's key= needs Python 3.10
+    i = bisect_right([seconds for (seconds, _, _) in timeline], offset)
+
+    while True:
+        if i == len(timeline):
+            week_start += timedelta(weeks=1)
+            i = 0
+
+        (seconds, event, name) = timeline[i]
+        yield (week_start + timedelta(seconds=seconds), name, event)
+        i += 1
+
+
+async def watch_changes(timeline, start_datetime=None, now=datetime.now):
+    # Async version for long-running consumers: each event is yielded once
+    # its time has come
+    if start_datetime is None:
+        start_datetime = now()
+
+    for (moment, name, event) in change_feed(timeline, start_datetime):
+        delay = (moment - now()).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        yield (moment, name, event)
+
+
+def load_timeline(source):
+    return weekly_timeline(load_restaurants(source))
+
+
+def _test_weekly_timeline():
+    from collections import Counter
+    from itertools import groupby
+    from restaurant_index import RestaurantIndex
+
+    restaurants = load_restaurants("rest_hours.csv")
+    index = RestaurantIndex(restaurants)
+    timeline = weekly_timeline(restaurants)
+
+    assert timeline == sorted(timeline)
+    assert all(seconds % 60 == 0 for (seconds, _, _) in timeline)
+
+    # Replaying a week of events from the open set at the start keeps it
+    # equal to a fresh query once each moment's events are applied
+    start = datetime(2020, 11, 16, 0, 0)
+    open_now = Counter(index.open_restaurants(start))
+
+    feed = change_feed(timeline, start)
+    for (moment, events) in groupby(feed, key=lambda event: event[0]):
+        if moment >= start + timedelta(weeks=1):
+            break
+
+        for (_, name, event) in events:
+            open_now[name] += 1 if event == OPENED else -1
+            assert open_now[name] in (0, 1)
+
+        assert +open_now == Counter(index.open_restaurants(moment))
+
+
+def _test_overlapping_and_constant_hours():
+    from find_open_restaurants import parse_restaurant
+
+    restaurants = [
+        parse_restaurant("Overlap", "Mon 9 am - 12 pm  / Mon 11 am - 5 pm"),
+        parse_restaurant("Always", "Mon-Sun 24 hours"),
+        parse_restaurant("Late", "Sun 11 pm - 1 am")
+    ]
+    timeline = weekly_timeline(restaurants)
+
+    assert timeline == [
+        (1*60*60, CLOSED, "Late"),
+        (9*60*60, OPENED, "Overlap"),
+        (17*60*60, CLOSED, "Overlap"),
+        ((6*24 + 23)*60*60, OPENED, "Late")
+    ]
+
+    # Starting mid-week carries on into the following weeks
+    feed = change_feed(timeline, datetime(2020, 11, 22, 12, 0))
+    assert [next(feed) for _ in range(3)] == [
+        (datetime(2020, 11, 22, 23, 0), "Late", OPENED),
+        (datetime(2020, 11, 23, 1, 0), "Late", CLOSED),
+        (datetime(2020, 11, 23, 9, 0), "Overlap", OPENED)
+    ]
+
+    # Events exactly at the start are left out
+    feed = change_feed(timeline, datetime(2020, 11, 23, 9, 0))
+    assert next(feed)[0] == datetime(2020, 11, 23, 17, 0)
+
+    # Nothing to report for a restaurant that never closes
+    always = weekly_timeline(restaurants[1:2])
+    assert always == []
+    assert list(change_feed(always, datetime.now())) == []
+
+
+def _test_watch_changes():
+    from find_open_restaurants import parse_restaurant
+
+    timeline = weekly_timeline([
+        parse_restaurant("Cafe", "Mon 9 am - 5 pm")
+    ])
+    start = datetime(2020, 11, 16, 8, 0)
+
+    # A clock already past every event never sleeps
+    async def first_events():
+        events = []
+        async for event in watch_changes(
+            timeline,
+            start,
+            now=lambda: datetime(2030, 1, 1)
+        ):
+            events.append(event)
+            if len(events) == 3:
+                return events
+
+    assert asyncio.run(first_events()) == [
+        (datetime(2020, 11, 16, 9, 0), "Cafe", OPENED),
+        (datetime(2020, 11, 16, 17, 0), "Cafe", CLOSED),
+        (datetime(2020, 11, 23, 9, 0), "Cafe", OPENED)
+    ]
+
+
+if __name__ == "__main__":
+    _test_weekly_timeline()
+    _test_overlapping_and_constant_hours()
+    _test_watch_changes()
@@ -0,0 +1,164 @@
+import os
+import tempfile
+from find_open_restaurants import (
+    iter_restaurants,
+    load_restaurants,
+    parse_restaurant
+)
+
+
+SECONDS_PER_DAY = 24*60*60
+
+COLUMNS = [
+    "restaurant",
+    "day",
+    "open_seconds",
+    "close_seconds",
+    "wraps_week"
+]
+
+FORMATS = ["parquet", "arrow"]
+
+
+def iter_schedule_rows(restaurants):
+    for rest in restaurants:
+        for hour_range in rest["hours_datetimes"]:
+            open_seconds = int(hour_range["open_datetime"])
+            close_seconds = int(hour_range["close_datetime"])
+
+            yield (
+                rest["name"],
+                open_seconds // SECONDS_PER_DAY,
+                open_seconds,
+                close_seconds,
+                # e.g. "Sun 11 am - 2 am" closes in the following week
+                close_seconds < open_seconds
+            )
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Columnar export needs pyarrow: pip install pyarrow"
+        ) from e
+
+    return pyarrow
+
+
+def _schema(pa):
+    return pa.schema([
+        ("restaurant", pa.string()),
+        ("day", pa.int8()),
+        ("open_seconds", pa.int32()),
+        ("close_seconds", pa.int32()),
+        ("wraps_week", pa.bool_())
+    ])
+
+
+def _row_groups(rows, row_group_size):
+    columns = [[] for _ in COLUMNS]
+
+    for row in rows:
+        for (column, value) in zip(columns, row):
+            column.append(value)
+
+        if len(columns[0]) == row_group_size:
+            yield columns
+            columns = [[] for _ in COLUMNS]
+
+    if columns[0]:
+        yield columns
+
+
+def export_schedules(
+    csv_filename,
+    output_filename,
+    format="parquet",
+    row_group_size=64*1024
+):
+    assert format in FORMATS, "Format must be one of " + ", ".join(FORMATS)
+
+    pa = _import_pyarrow()
+    schema = _schema(pa)
+
+    if format == "parquet":
+        import pyarrow.parquet
+
+        writer = pyarrow.parquet.ParquetWriter(output_filename, schema)
+        write_batch = writer.write_batch
+    else:
+        import pyarrow.ipc
+
+        writer = pyarrow.ipc.new_file(output_filename, schema)
+        write_batch = writer.write_batch
+
+    n_rows = 0
+
+    # Only one row group of Python values is alive at a time
+    try:
+        for columns in _row_groups(
+            iter_schedule_rows(iter_restaurants(csv_filename)),
+            row_group_size
+        ):
+            write_batch(pa.record_batch(columns, schema=schema))
+            n_rows += len(columns[0])
+    finally:
+        writer.close()
+
+    return n_rows
+
+
+def _test_iter_schedule_rows():
+    restaurants = [parse_restaurant("Night Owl", "Sun 11 pm - 2 am")]
+
+    assert list(iter_schedule_rows(restaurants)) == [
+        ("Night Owl", 6, 6*SECONDS_PER_DAY + 23*60*60, 2*60*60, True)
+    ]
+
+
+def _test_export_schedules():
+    try:
+        _import_pyarrow()
+    except ImportError:
+        print("pyarrow not installed, skipping _test_export_schedules")
+        return
+
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    csv_filename = "rest_hours.csv"
+    expected = list(iter_schedule_rows(load_restaurants(csv_filename)))
+
+    for format in FORMATS:
+        (fd, output_filename) = tempfile.mkstemp(suffix="." + format)
+        os.close(fd)
+
+        try:
+            n_rows = export_schedules(
+                csv_filename,
+                output_filename,
+                format=format,
+                row_group_size=100
+            )
+
+            if format == "parquet":
+                parquet_file = pyarrow.parquet.ParquetFile(output_filename)
+                assert parquet_file.num_row_groups == -(-n_rows // 100)
+                table = parquet_file.read()
+            else:
+                with pyarrow.ipc.open_file(output_filename) as reader:
+                    table = reader.read_all()
+        finally:
+            os.remove(output_filename)
+
+        assert n_rows == len(expected)
+        assert table.column_names == COLUMNS
+        assert list(zip(*(table.column(c).to_pylist() for c in COLUMNS))) \
+            == expected
+
+
+if __name__ == "__main__":
+    _test_iter_schedule_rows()
+    _test_export_schedules()
@@ -0,0 +1,261 @@
+import importlib
+import random
+import sys
+import time
+from open_hours_parser import parse as reference_parse
+
+
+# Accelerated parsers and the speedup each must keep over the reference.
+# The floors sit well under what they measure so machine noise does not
+# fail the gate, but losing most of the gain does.
+ACCELERATED = {
+    "generated": ("generated_parser:parse", 1.5)
+}
+
+REPEATS = 5
+N_SYNTHETIC = 5000
+N_FUZZED = 5000
+N_MISMATCHES_SHOWN = 5
+
+_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def resolve(name):
+    # "generated" or any "module:function"
+    if name in ACCELERATED:
+        name = ACCELERATED[name][0]
+
+    (module, function) = name.split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+# Corpora
+def csv_corpus(csv_filename="rest_hours.csv"):
+    from parser_fuzzer import load_seeds
+    return load_seeds(csv_filename)
+
+
+def _synthetic_time(rng):
+    hour = rng.randint(1, 12)
+    meridiem = rng.choice(["am", "pm"])
+
+    if rng.random() < 0.5:
+        return "{} {}".format(hour, meridiem)
+
+    return "{}:{:02d} {}".format(hour, rng.choice([0, 15, 30, 45]), meridiem)
+
+
+def _synthetic_days(rng):
+    items = []
+    for _ in range(rng.randint(1, 3)):
+        if rng.random() < 0.5:
+            items.append(rng.choice(_WEEKDAYS))
+        else:
+            items.append("{}-{}".format(
+                rng.choice(_WEEKDAYS),
+                rng.choice(_WEEKDAYS)
+            ))
+
+    return ", ".join(items)
+
+
+def synthetic_corpus(n=N_SYNTHETIC, seed=0):
+    # Well-formed hours in the catalogue's shapes, including ranges that
+    # wrap past Sunday and times that close after midnight
+    rng = random.Random(seed)
+
+    return [
+        "  / ".join(
+            "{} {} - {}".format(
+                _synthetic_days(rng),
+                _synthetic_time(rng),
+                _synthetic_time(rng)
+            )
+            for _ in range(rng.randint(1, 4))
+        )
+        for _ in range(n)
+    ]
+
+
+def fuzzed_corpus(n=N_FUZZED, seed=0):
+    from parser_fuzzer import mutate
+
+    seeds = csv_corpus()
+    rng = random.Random(seed)
+
+    return [mutate(rng.choice(seeds), rng, seeds) for _ in range(n)]
+
+
+# Comparison
+def _outcome(parser, input):
+    # A crash is an outcome like any other, so it is reported as a mismatch
+    # rather than stopping the gate. Exceptions only equal themselves.
+    try:
+        return parser(input)
+    except Exception as e:
+        return e
+
+
+def mismatches(candidate, inputs):
+    # Results must be equal outright: same intervals in the same order, the
+    # same unparsed rest, the same failures
+    return [
+        input for input in inputs
+        if _outcome(candidate, input) != reference_parse(input)
+    ]
+
+
+def _best_seconds(parser, inputs):
+    best_s = None
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for input in inputs:
+            parser(input)
+        elapsed = time.perf_counter() - start
+
+        if best_s is None or elapsed < best_s:
+            best_s = elapsed
+
+    return best_s
+
+
+def speedup(candidate, inputs):
+    return _best_seconds(reference_parse, inputs) \
+        / _best_seconds(candidate, inputs)
+
+
+def run(name, corpora, min_speedup):
+    candidate = resolve(name)
+    passed = True
+
+    for (corpus_name, inputs) in corpora:
+        wrong = mismatches(candidate, inputs)
+        # Timed only on inputs it gets right, which it cannot crash on
+        wrong_set = set(wrong)
+        ratio = speedup(
+            candidate,
+            [input for input in inputs if input not in wrong_set]
+        )
+
+        print("{} on {} ({} inputs): {} mismatches, {:.2f}x the "
+              "reference".format(
+                  name,
+                  corpus_name,
+                  len(inputs),
+                  len(wrong),
+                  ratio
+              ))
+        for input in wrong[:N_MISMATCHES_SHOWN]:
+            print("  {!r}".format(input))
+
+        if wrong:
+            passed = False
+        if min_speedup is not None and ratio < min_speedup:
+            print("  slower than the {:.2f}x floor".format(min_speedup))
+            passed = False
+
+    return passed
+
+
+def _test_mismatches():
+    inputs = csv_corpus() + synthetic_corpus(200) + fuzzed_corpus(200)
+
+    assert mismatches(resolve("generated"), inputs) == []
+
+    # A parser that drops the unparsed rest is caught
+    def careless(input):
+        if result := reference_parse(input):
+            return (result[0], "")
+
+    wrong = mismatches(careless, inputs)
+    assert wrong
+    assert all(reference_parse(input)[1] for input in wrong)
+
+    # As is one that crashes, without stopping the comparison
+    def crashing(input):
+        if "Sat" in input:
+            raise ValueError(input)
+        return reference_parse(input)
+
+    wrong = mismatches(crashing, inputs)
+    assert wrong
+    assert all("Sat" in input for input in wrong)
+
+
+def _test_synthetic_corpus():
+    inputs = synthetic_corpus(500, seed=1)
+
+    assert inputs == synthetic_corpus(500, seed=1)
+    for input in inputs:
+        (_, rest) = reference_parse(input)
+        assert rest == "", repr(input)
+
+
+def _test_resolve():
+    import generated_parser
+
+    assert resolve("generated") is generated_parser.parse
+    assert resolve("open_hours_parser:parse") is reference_parse
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Check an accelerated parser against the reference "
+                    "parse() for identical results and a minimum speedup."
+    )
+    parser.add_argument(
+        "implementations",
+        nargs="*",
+        default=list(ACCELERATED),
+        help="names from ACCELERATED or module:function (default: all of "
+             "ACCELERATED)"
+    )
+    parser.add_argument("--synthetic", type=int, default=N_SYNTHETIC)
+    parser.add_argument("--fuzzed", type=int, default=N_FUZZED)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--min-speedup",
+        type=float,
+        default=None,
+        help="override each implementation's speedup floor"
+    )
+    parser.add_argument(
+        "--self-test",
+        action="store_true",
+        help="run this module's tests and exit"
+    )
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        _test_resolve()
+        _test_synthetic_corpus()
+        _test_mismatches()
+        return 0
+
+    corpora = [
+        ("rest_hours.csv", csv_corpus()),
+        ("synthetic", synthetic_corpus(args.synthetic, args.seed)),
+        ("fuzzed", fuzzed_corpus(args.fuzzed, args.seed))
+    ]
+
+    failed = []
+    for name in args.implementations:
+        min_speedup = args.min_speedup
+        if min_speedup is None and name in ACCELERATED:
+            min_speedup = ACCELERATED[name][1]
+
+        if not run(name, corpora, min_speedup):
+            failed.append(name)
+
+    if failed:
+        print("Regressed: " + ", ".join(failed))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
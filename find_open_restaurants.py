@@ -1,41 +1,136 @@
-import csv
-from datetime import datetime
-from open_hours_parser import parse
+import sys
+from time import perf_counter
+from metrics import REGISTRY
+from open_hours_parser import parse, parse_error
 from modular_datetime import DatetimeModWeek, datetime_in_range
+from row_sources import rows, sqlite_rows
 
 
-def find_open_restaurants(csv_filename, search_datetime):
-    with open(csv_filename, newline="") as f:
-        entries = list(csv.reader(f))
+_CSV_READ_SECONDS = REGISTRY.histogram(
+    "restaurants_csv_read_seconds",
+    "Time to read one row of the catalogue from its row source"
+)
+_PARSE_SECONDS = REGISTRY.histogram(
+    "restaurants_parse_seconds",
+    "Time to parse one restaurant's hours"
+)
+_PARSE_FAILURES = REGISTRY.counter(
+    "restaurants_parse_failures_total",
+    "Catalogue rows skipped because their hours did not parse"
+)
 
-    search_datetime_modular = DatetimeModWeek(
-        search_datetime.weekday(),
-        search_datetime.hour,
-        search_datetime.minute
-    )
 
-    # Rearrange CSV into useful data structure
-    restaurants = []
+def _timed_rows(rows):
+    rows = iter(rows)
+
+    while True:
+        start = perf_counter()
+        entry = next(rows, None)
+        if entry is None:
+            return
+
+        _CSV_READ_SECONDS.observe(perf_counter() - start)
+        yield entry
+
+
+def _timed_parse(hours_string):
+    start = perf_counter()
+    result = parse(hours_string)
+    _PARSE_SECONDS.observe(perf_counter() - start)
+
+    return result
 
-    for entry in entries:
-        restaurants.append(
-            {
-                "name": entry[0],
-                "hours_string": entry[1]
-            }
-        )
 
-    for (i, rest) in enumerate(restaurants):
-        result = parse(rest["hours_string"])
+def parse_restaurant(name, hours_string, cache=None):
+    # A cache (see parse_cache.py) answers for hours it has seen before
+    if cache is None or (data := cache.get(hours_string)) is None:
+        result = _timed_parse(hours_string)
 
         assert result is not None
         (data, rest) = result
         assert rest == ""
 
-        restaurants[i]["hours_datetimes"] = data
+        if cache is not None:
+            cache.put(hours_string, data)
+
+    return {
+        "name": name,
+        "hours_string": hours_string,
+        "hours_datetimes": data
+    }
+
+
+def iter_restaurants(source, extra_columns=(), cache=None):
+    # source is a CSV filename or any row source (see row_sources.py).
+    # Rows are parsed as they are read, so callers that stream the
+    # catalogue never hold all of it in memory.
+    for entry in _timed_rows(rows(source)):
+        restaurant = parse_restaurant(entry[0], entry[1], cache)
+
+        # Columns after the hours, e.g. cuisine or city, named by the
+        # caller since the CSV has no header
+        if extra_columns:
+            restaurant["columns"] = dict(zip(extra_columns, entry[2:]))
+
+        yield restaurant
+
+
+def load_restaurants(source, extra_columns=(), cache=None):
+    return list(iter_restaurants(source, extra_columns, cache))
+
+
+def load_restaurants_with_errors(source):
+    restaurants = []
+    errors = []
+
+    for (row, entry) in enumerate(_timed_rows(rows(source)), start=1):
+        if len(entry) < 2:
+            _PARSE_FAILURES.inc()
+            errors.append({
+                "row": row,
+                "offset": 0,
+                "expected": ("hours column",)
+            })
+            continue
+
+        result = _timed_parse(entry[1])
+
+        if result is not None and result[1] == "":
+            restaurants.append({
+                "name": entry[0],
+                "hours_string": entry[1],
+                "hours_datetimes": result[0]
+            })
+        else:
+            # Only failed rows pay for the diagnostic re-parse
+            _PARSE_FAILURES.inc()
+            error = parse_error(entry[1])
+            error["row"] = row
+            errors.append(error)
+
+    return (restaurants, errors)
+
+
+def format_error_report(errors):
+    return "\n".join(
+        "row {}, byte {}: expected {}".format(
+            error["row"],
+            error["offset"],
+            " or ".join(error["expected"])
+        )
+        for error in errors
+    )
+
+
+def open_restaurants(restaurants, search_datetime):
+    search_datetime_modular = DatetimeModWeek(
+        search_datetime.weekday(),
+        search_datetime.hour,
+        search_datetime.minute
+    )
 
     open_restaurants = []
-    
+
     for rest in restaurants:
         for hour_range in rest["hours_datetimes"]:
             if datetime_in_range(
@@ -44,10 +139,66 @@ def find_open_restaurants(csv_filename, search_datetime):
                 search_datetime_modular
             ):
                 open_restaurants.append(rest["name"])
-    
+
     return open_restaurants
 
+
+def find_open_restaurants(source, search_datetime, cache=None):
+    return open_restaurants(
+        load_restaurants(source, cache=cache),
+        search_datetime
+    )
+
+def _test_load_restaurants_with_errors():
+    import csv
+    import os
+    import tempfile
+
+    csv_filename = "rest_hours.csv"
+
+    (restaurants, errors) = load_restaurants_with_errors(csv_filename)
+    assert restaurants == load_restaurants(csv_filename)
+    assert errors == []
+
+    (fd, bad_filename) = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            csv.writer(f).writerows([
+                ["Good", "Mon-Sun 11 am - 10 pm"],
+                ["Trailing", "Mon 9 am - 5 pm Banana"],
+                ["No hours"],
+                ["Bad hour", "Tue 13 am - 5 pm"],
+                ["Also good", "Sat 9 am - 1 pm"]
+            ])
+
+        (restaurants, errors) = load_restaurants_with_errors(bad_filename)
+    finally:
+        os.remove(bad_filename)
+
+    assert [rest["name"] for rest in restaurants] == ["Good", "Also good"]
+    assert [error["row"] for error in errors] == [2, 3, 4]
+    assert errors[0]["offset"] == 16
+    assert errors[1]["expected"] == ("hours column",)
+    assert format_error_report(errors).splitlines()[0] == \
+        "row 2, byte 16: expected ' ' or '/'"
+
+
+def _test_row_sources():
+    csv_filename = "rest_hours.csv"
+    restaurants = load_restaurants(csv_filename)
+
+    # Any iterable of (name, hours) rows loads the same as the CSV
+    rows_read = [
+        (rest["name"], rest["hours_string"])
+        for rest in restaurants
+    ]
+    assert load_restaurants(iter(rows_read)) == restaurants
+    assert load_restaurants_with_errors(rows_read) == (restaurants, [])
+
+
 def test_find_open_restaurants():
+    from datetime import datetime
+
     csv_filename = "rest_hours.csv"
     search_datetime = datetime(2020, 11, 14, 13, 45)
 
@@ -55,5 +206,185 @@ def test_find_open_restaurants():
 
     print(open_restaurants)
 
+# Profiling
+# Reports go to stderr so stdout stays the list of restaurants
+def _profile_cprofile(workload, top):
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(workload)
+
+    sys.stderr.write("Top {} functions by own time:\n".format(top))
+    pstats.Stats(profiler, stream=sys.stderr) \
+        .sort_stats("tottime") \
+        .print_stats(top)
+
+    return result
+
+
+def _profile_tracemalloc(workload, top):
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        result = workload()
+        snapshot = tracemalloc.take_snapshot()
+        (_, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    sys.stderr.write("Top {} allocation sites:\n".format(top))
+    for stat in snapshot.statistics("lineno")[:top]:
+        sys.stderr.write("  {}\n".format(stat))
+
+    (restaurants, _) = result
+    sys.stderr.write(
+        "Peak memory: {} bytes, {:.0f} bytes per restaurant\n".format(
+            peak,
+            peak / max(len(restaurants), 1)
+        )
+    )
+
+    return result
+
+
+PROFILERS = {
+    "cprofile": _profile_cprofile,
+    "tracemalloc": _profile_tracemalloc
+}
+
+
+def _test_profile_modes():
+    import contextlib
+    import io
+    from datetime import datetime
+
+    for (mode, expected) in [
+        ("cprofile", "sequence_lambda"),
+        ("tracemalloc", "bytes per restaurant")
+    ]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(stdout), \
+                contextlib.redirect_stderr(stderr):
+            assert main([
+                "--at", "2020-11-14T13:45",
+                "--profile", mode,
+                "--top", "5"
+            ]) == 0
+
+        assert expected in stderr.getvalue()
+        # The restaurants are printed as usual
+        assert stdout.getvalue().splitlines() == find_open_restaurants(
+            "rest_hours.csv",
+            datetime(2020, 11, 14, 13, 45)
+        )
+
+
+def _self_test():
+    _test_load_restaurants_with_errors()
+    _test_row_sources()
+    _test_profile_modes()
+    test_find_open_restaurants()
+
+
+def main(argv=None):
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(
+        description="List the restaurants open at a given time."
+    )
+    parser.add_argument(
+        "csv_filename",
+        nargs="?",
+        default="rest_hours.csv",
+        help="restaurant hours CSV, or SQLite database with --query "
+             "(default: rest_hours.csv)"
+    )
+    parser.add_argument(
+        "--query",
+        help="read (name, hours) rows from the SQLite database given as "
+             "the file, with this query, e.g. "
+             "\"SELECT name, hours FROM restaurants\""
+    )
+    parser.add_argument(
+        "--at",
+        dest="search_datetime",
+        type=datetime.fromisoformat,
+        help="ISO 8601 date and time to search, e.g. 2020-11-14T13:45 "
+             "(default: now)"
+    )
+    parser.add_argument(
+        "--parse-cache",
+        action="store_true",
+        help="reuse parsed hours from a sidecar file next to the CSV "
+             "(<csv>.parsed.json), parsing and saving only rows whose hours "
+             "changed"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILERS),
+        help="run the load and query under cProfile or tracemalloc and "
+             "print the top functions or allocation sites to stderr"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="how many functions or allocation sites --profile prints "
+             "(default: 20)"
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="print load and parse metrics in Prometheus text format to "
+             "stderr"
+    )
+    parser.add_argument(
+        "--self-test",
+        action="store_true",
+        help="run this module's tests and exit"
+    )
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        _self_test()
+        return 0
+
+    search_datetime = args.search_datetime or datetime.now()
+
+    if args.query:
+        source = sqlite_rows(args.csv_filename, args.query)
+    else:
+        source = args.csv_filename
+
+    cache = None
+    if args.parse_cache:
+        from parse_cache import ParseCache, sidecar_filename
+        cache = ParseCache(sidecar_filename(args.csv_filename))
+
+    def workload():
+        restaurants = load_restaurants(source, cache=cache)
+        return (restaurants, open_restaurants(restaurants, search_datetime))
+
+    if args.profile:
+        (_, names) = PROFILERS[args.profile](workload, args.top)
+    else:
+        (_, names) = workload()
+
+    for name in names:
+        print(name)
+
+    if cache is not None:
+        cache.save()
+
+    if args.metrics:
+        sys.stderr.write(REGISTRY.to_prometheus())
+
+    return 0
+
+
 if __name__ == "__main__":
-    test_find_open_restaurants()
\ No newline at end of file
+    sys.exit(main())
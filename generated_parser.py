@@ -0,0 +1,1117 @@
+# Generated by parser_generator.py from its GRAMMAR. Do not edit;
+# change the grammar and run python parser_generator.py --write
+# instead.
+from modular_datetime import DatetimeModWeek
+from open_hours_parser import expand_schedule, remove_closed_days
+
+
+_WEEKDAY_NUMBERS = {
+    "Mon": 0,
+    "Tue": 1,
+    "Wed": 2,
+    "Thu": 3,
+    "Fri": 4,
+    "Sat": 5,
+    "Sun": 6
+}
+_MERIDIEM_HOURS = {
+    "am": 0,
+    "pm": 12
+}
+
+# Start day to end day inclusive, wrapping past Sunday
+_DAY_RANGE_MASKS = [
+    [
+        sum(1 << (start + i) % 7 for i in range((end - start) % 7 + 1))
+        for end in range(7)
+    ]
+    for start in range(7)
+]
+
+# Every minute of the day. Mod values are never changed in place, so
+# results can share them.
+_TIMES = [
+    DatetimeModWeek(0, hour, minute)
+    for hour in range(24)
+    for minute in range(60)
+]
+
+_ONE_DAY = DatetimeModWeek(1, 0, 0)
+
+_DIGITS = "0123456789"
+
+
+def parse_schedule(input):
+    n = len(input)
+    pos = 0
+    # schedule
+    # segment
+    start_4 = pos
+    # datetime
+    start_5 = pos
+    # days
+    # day_item
+    start_9 = pos
+    # day_range
+    start_10 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+    ok = start_10 is not None
+    if ok:
+        pos += 3
+    if ok:
+        start_12 = pos
+        if input[pos:pos + 1] == '-':
+            pos += 1
+            ok = True
+        else:
+            ok = False
+        if not ok:
+            pos = start_12
+            if input[pos:pos + 1] == '–':
+                pos += 1
+                ok = True
+            else:
+                ok = False
+        if ok:
+            end_13 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+            ok = end_13 is not None
+            if ok:
+                pos += 3
+            if ok:
+                item_7 = _DAY_RANGE_MASKS[start_10][end_13]
+    if not ok:
+        pos = start_9
+        # weekday
+        day_num_14 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+        ok = day_num_14 is not None
+        if ok:
+            pos += 3
+        if ok:
+            item_7 = 1 << day_num_14
+    if ok:
+        days_6 = item_7
+        while True:
+            save_8 = pos
+            if input.startswith(', ', pos):
+                pos += 2
+                ok = True
+            else:
+                ok = False
+            if ok:
+                # day_item
+                start_15 = pos
+                # day_range
+                start_16 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                ok = start_16 is not None
+                if ok:
+                    pos += 3
+                if ok:
+                    start_18 = pos
+                    if input[pos:pos + 1] == '-':
+                        pos += 1
+                        ok = True
+                    else:
+                        ok = False
+                    if not ok:
+                        pos = start_18
+                        if input[pos:pos + 1] == '–':
+                            pos += 1
+                            ok = True
+                        else:
+                            ok = False
+                    if ok:
+                        end_19 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                        ok = end_19 is not None
+                        if ok:
+                            pos += 3
+                        if ok:
+                            item_7 = _DAY_RANGE_MASKS[start_16][end_19]
+                if not ok:
+                    pos = start_15
+                    # weekday
+                    day_num_20 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                    ok = day_num_20 is not None
+                    if ok:
+                        pos += 3
+                    if ok:
+                        item_7 = 1 << day_num_20
+            if not ok:
+                pos = save_8
+                break
+            days_6 |= item_7
+        ok = True
+    if ok:
+        if input[pos:pos + 1] == ' ':
+            pos += 1
+            ok = True
+        else:
+            ok = False
+        if ok:
+            # time
+            start_23 = pos
+            end_25 = pos
+            while end_25 < n and input[end_25] in _DIGITS:
+                end_25 += 1
+            ok = end_25 > pos
+            if ok:
+                first_26 = pos
+                while first_26 < end_25 - 1 and input[first_26] == "0":
+                    first_26 += 1
+                ok = end_25 - first_26 <= 2
+                if ok:
+                    hour_24 = int(input[first_26:end_25])
+                    ok = 1 <= hour_24 < 13
+                pos = end_25
+            if ok:
+                if input[pos:pos + 1] == ':':
+                    pos += 1
+                    ok = True
+                else:
+                    ok = False
+                if ok:
+                    end_29 = pos
+                    while end_29 < n and input[end_29] in _DIGITS:
+                        end_29 += 1
+                    ok = end_29 > pos
+                    if ok:
+                        first_30 = pos
+                        while first_30 < end_29 - 1 and input[first_30] == "0":
+                            first_30 += 1
+                        ok = end_29 - first_30 <= 2
+                        if ok:
+                            minute_28 = int(input[first_30:end_29])
+                            ok = 0 <= minute_28 < 60
+                        pos = end_29
+                    if ok:
+                        if input[pos:pos + 1] == ' ':
+                            pos += 1
+                            ok = True
+                        else:
+                            ok = False
+                        if ok:
+                            pm_32 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                            ok = pm_32 is not None
+                            if ok:
+                                pos += 2
+                            if ok:
+                                open_time_22 = _TIMES[(hour_24 % 12 + pm_32)*60 + minute_28]
+            if not ok:
+                pos = start_23
+                end_34 = pos
+                while end_34 < n and input[end_34] in _DIGITS:
+                    end_34 += 1
+                ok = end_34 > pos
+                if ok:
+                    first_35 = pos
+                    while first_35 < end_34 - 1 and input[first_35] == "0":
+                        first_35 += 1
+                    ok = end_34 - first_35 <= 2
+                    if ok:
+                        hour_33 = int(input[first_35:end_34])
+                        ok = 1 <= hour_33 < 13
+                    pos = end_34
+                if ok:
+                    if input[pos:pos + 1] == ' ':
+                        pos += 1
+                        ok = True
+                    else:
+                        ok = False
+                    if ok:
+                        pm_37 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                        ok = pm_37 is not None
+                        if ok:
+                            pos += 2
+                        if ok:
+                            open_time_22 = _TIMES[(hour_33 % 12 + pm_37)*60]
+                if not ok:
+                    pos = start_23
+                    if input.startswith('noon', pos):
+                        pos += 4
+                        ok = True
+                    else:
+                        ok = False
+                    if ok:
+                        open_time_22 = _TIMES[12*60]
+                    if not ok:
+                        pos = start_23
+                        if input.startswith('midnight', pos):
+                            pos += 8
+                            ok = True
+                        else:
+                            ok = False
+                        if ok:
+                            open_time_22 = _TIMES[0]
+            if ok:
+                start_41 = pos
+                if input.startswith(' - ', pos):
+                    pos += 3
+                    ok = True
+                else:
+                    ok = False
+                if not ok:
+                    pos = start_41
+                    if input.startswith(' – ', pos):
+                        pos += 3
+                        ok = True
+                    else:
+                        ok = False
+                if ok:
+                    # time
+                    start_43 = pos
+                    end_45 = pos
+                    while end_45 < n and input[end_45] in _DIGITS:
+                        end_45 += 1
+                    ok = end_45 > pos
+                    if ok:
+                        first_46 = pos
+                        while first_46 < end_45 - 1 and input[first_46] == "0":
+                            first_46 += 1
+                        ok = end_45 - first_46 <= 2
+                        if ok:
+                            hour_44 = int(input[first_46:end_45])
+                            ok = 1 <= hour_44 < 13
+                        pos = end_45
+                    if ok:
+                        if input[pos:pos + 1] == ':':
+                            pos += 1
+                            ok = True
+                        else:
+                            ok = False
+                        if ok:
+                            end_49 = pos
+                            while end_49 < n and input[end_49] in _DIGITS:
+                                end_49 += 1
+                            ok = end_49 > pos
+                            if ok:
+                                first_50 = pos
+                                while first_50 < end_49 - 1 and input[first_50] == "0":
+                                    first_50 += 1
+                                ok = end_49 - first_50 <= 2
+                                if ok:
+                                    minute_48 = int(input[first_50:end_49])
+                                    ok = 0 <= minute_48 < 60
+                                pos = end_49
+                            if ok:
+                                if input[pos:pos + 1] == ' ':
+                                    pos += 1
+                                    ok = True
+                                else:
+                                    ok = False
+                                if ok:
+                                    pm_52 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                                    ok = pm_52 is not None
+                                    if ok:
+                                        pos += 2
+                                    if ok:
+                                        close_time_42 = _TIMES[(hour_44 % 12 + pm_52)*60 + minute_48]
+                    if not ok:
+                        pos = start_43
+                        end_54 = pos
+                        while end_54 < n and input[end_54] in _DIGITS:
+                            end_54 += 1
+                        ok = end_54 > pos
+                        if ok:
+                            first_55 = pos
+                            while first_55 < end_54 - 1 and input[first_55] == "0":
+                                first_55 += 1
+                            ok = end_54 - first_55 <= 2
+                            if ok:
+                                hour_53 = int(input[first_55:end_54])
+                                ok = 1 <= hour_53 < 13
+                            pos = end_54
+                        if ok:
+                            if input[pos:pos + 1] == ' ':
+                                pos += 1
+                                ok = True
+                            else:
+                                ok = False
+                            if ok:
+                                pm_57 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                                ok = pm_57 is not None
+                                if ok:
+                                    pos += 2
+                                if ok:
+                                    close_time_42 = _TIMES[(hour_53 % 12 + pm_57)*60]
+                        if not ok:
+                            pos = start_43
+                            if input.startswith('noon', pos):
+                                pos += 4
+                                ok = True
+                            else:
+                                ok = False
+                            if ok:
+                                close_time_42 = _TIMES[12*60]
+                            if not ok:
+                                pos = start_43
+                                if input.startswith('midnight', pos):
+                                    pos += 8
+                                    ok = True
+                                else:
+                                    ok = False
+                                if ok:
+                                    close_time_42 = _TIMES[0]
+                    if ok:
+                        item_2 = {"days": days_6, "open_time": open_time_22, "close_time": close_time_42}
+    if not ok:
+        pos = start_5
+        # days
+        # day_item
+        start_63 = pos
+        # day_range
+        start_64 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+        ok = start_64 is not None
+        if ok:
+            pos += 3
+        if ok:
+            start_66 = pos
+            if input[pos:pos + 1] == '-':
+                pos += 1
+                ok = True
+            else:
+                ok = False
+            if not ok:
+                pos = start_66
+                if input[pos:pos + 1] == '–':
+                    pos += 1
+                    ok = True
+                else:
+                    ok = False
+            if ok:
+                end_67 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                ok = end_67 is not None
+                if ok:
+                    pos += 3
+                if ok:
+                    item_61 = _DAY_RANGE_MASKS[start_64][end_67]
+        if not ok:
+            pos = start_63
+            # weekday
+            day_num_68 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+            ok = day_num_68 is not None
+            if ok:
+                pos += 3
+            if ok:
+                item_61 = 1 << day_num_68
+        if ok:
+            days_60 = item_61
+            while True:
+                save_62 = pos
+                if input.startswith(', ', pos):
+                    pos += 2
+                    ok = True
+                else:
+                    ok = False
+                if ok:
+                    # day_item
+                    start_69 = pos
+                    # day_range
+                    start_70 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                    ok = start_70 is not None
+                    if ok:
+                        pos += 3
+                    if ok:
+                        start_72 = pos
+                        if input[pos:pos + 1] == '-':
+                            pos += 1
+                            ok = True
+                        else:
+                            ok = False
+                        if not ok:
+                            pos = start_72
+                            if input[pos:pos + 1] == '–':
+                                pos += 1
+                                ok = True
+                            else:
+                                ok = False
+                        if ok:
+                            end_73 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                            ok = end_73 is not None
+                            if ok:
+                                pos += 3
+                            if ok:
+                                item_61 = _DAY_RANGE_MASKS[start_70][end_73]
+                    if not ok:
+                        pos = start_69
+                        # weekday
+                        day_num_74 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                        ok = day_num_74 is not None
+                        if ok:
+                            pos += 3
+                        if ok:
+                            item_61 = 1 << day_num_74
+                if not ok:
+                    pos = save_62
+                    break
+                days_60 |= item_61
+            ok = True
+        if ok:
+            if input.startswith(' 24 hours', pos):
+                pos += 9
+                ok = True
+            else:
+                ok = False
+            if ok:
+                item_2 = {"days": days_60, "open_time": _TIMES[0], "close_time": _ONE_DAY}
+    if not ok:
+        pos = start_4
+        # closed
+        if input.startswith('Closed ', pos):
+            pos += 7
+            ok = True
+        else:
+            ok = False
+        if ok:
+            # days
+            # day_item
+            start_80 = pos
+            # day_range
+            start_81 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+            ok = start_81 is not None
+            if ok:
+                pos += 3
+            if ok:
+                start_83 = pos
+                if input[pos:pos + 1] == '-':
+                    pos += 1
+                    ok = True
+                else:
+                    ok = False
+                if not ok:
+                    pos = start_83
+                    if input[pos:pos + 1] == '–':
+                        pos += 1
+                        ok = True
+                    else:
+                        ok = False
+                if ok:
+                    end_84 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                    ok = end_84 is not None
+                    if ok:
+                        pos += 3
+                    if ok:
+                        item_78 = _DAY_RANGE_MASKS[start_81][end_84]
+            if not ok:
+                pos = start_80
+                # weekday
+                day_num_85 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                ok = day_num_85 is not None
+                if ok:
+                    pos += 3
+                if ok:
+                    item_78 = 1 << day_num_85
+            if ok:
+                days_77 = item_78
+                while True:
+                    save_79 = pos
+                    if input.startswith(', ', pos):
+                        pos += 2
+                        ok = True
+                    else:
+                        ok = False
+                    if ok:
+                        # day_item
+                        start_86 = pos
+                        # day_range
+                        start_87 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                        ok = start_87 is not None
+                        if ok:
+                            pos += 3
+                        if ok:
+                            start_89 = pos
+                            if input[pos:pos + 1] == '-':
+                                pos += 1
+                                ok = True
+                            else:
+                                ok = False
+                            if not ok:
+                                pos = start_89
+                                if input[pos:pos + 1] == '–':
+                                    pos += 1
+                                    ok = True
+                                else:
+                                    ok = False
+                            if ok:
+                                end_90 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                ok = end_90 is not None
+                                if ok:
+                                    pos += 3
+                                if ok:
+                                    item_78 = _DAY_RANGE_MASKS[start_87][end_90]
+                        if not ok:
+                            pos = start_86
+                            # weekday
+                            day_num_91 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                            ok = day_num_91 is not None
+                            if ok:
+                                pos += 3
+                            if ok:
+                                item_78 = 1 << day_num_91
+                    if not ok:
+                        pos = save_79
+                        break
+                    days_77 |= item_78
+                ok = True
+            if ok:
+                item_2 = {"closed": days_77}
+        if not ok:
+            pos = start_4
+            # every_day
+            if input.startswith('24 hours', pos):
+                pos += 8
+                ok = True
+            else:
+                ok = False
+            if ok:
+                item_2 = {"days": 0b1111111, "open_time": _TIMES[0], "close_time": _ONE_DAY}
+    if ok:
+        segments_1 = [item_2]
+        while True:
+            save_3 = pos
+            start_93 = pos
+            if input.startswith('  / ', pos):
+                pos += 4
+                ok = True
+            else:
+                ok = False
+            if not ok:
+                pos = start_93
+                if input.startswith(' / ', pos):
+                    pos += 3
+                    ok = True
+                else:
+                    ok = False
+            if ok:
+                # segment
+                start_94 = pos
+                # datetime
+                start_95 = pos
+                # days
+                # day_item
+                start_99 = pos
+                # day_range
+                start_100 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                ok = start_100 is not None
+                if ok:
+                    pos += 3
+                if ok:
+                    start_102 = pos
+                    if input[pos:pos + 1] == '-':
+                        pos += 1
+                        ok = True
+                    else:
+                        ok = False
+                    if not ok:
+                        pos = start_102
+                        if input[pos:pos + 1] == '–':
+                            pos += 1
+                            ok = True
+                        else:
+                            ok = False
+                    if ok:
+                        end_103 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                        ok = end_103 is not None
+                        if ok:
+                            pos += 3
+                        if ok:
+                            item_97 = _DAY_RANGE_MASKS[start_100][end_103]
+                if not ok:
+                    pos = start_99
+                    # weekday
+                    day_num_104 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                    ok = day_num_104 is not None
+                    if ok:
+                        pos += 3
+                    if ok:
+                        item_97 = 1 << day_num_104
+                if ok:
+                    days_96 = item_97
+                    while True:
+                        save_98 = pos
+                        if input.startswith(', ', pos):
+                            pos += 2
+                            ok = True
+                        else:
+                            ok = False
+                        if ok:
+                            # day_item
+                            start_105 = pos
+                            # day_range
+                            start_106 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                            ok = start_106 is not None
+                            if ok:
+                                pos += 3
+                            if ok:
+                                start_108 = pos
+                                if input[pos:pos + 1] == '-':
+                                    pos += 1
+                                    ok = True
+                                else:
+                                    ok = False
+                                if not ok:
+                                    pos = start_108
+                                    if input[pos:pos + 1] == '–':
+                                        pos += 1
+                                        ok = True
+                                    else:
+                                        ok = False
+                                if ok:
+                                    end_109 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                    ok = end_109 is not None
+                                    if ok:
+                                        pos += 3
+                                    if ok:
+                                        item_97 = _DAY_RANGE_MASKS[start_106][end_109]
+                            if not ok:
+                                pos = start_105
+                                # weekday
+                                day_num_110 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                ok = day_num_110 is not None
+                                if ok:
+                                    pos += 3
+                                if ok:
+                                    item_97 = 1 << day_num_110
+                        if not ok:
+                            pos = save_98
+                            break
+                        days_96 |= item_97
+                    ok = True
+                if ok:
+                    if input[pos:pos + 1] == ' ':
+                        pos += 1
+                        ok = True
+                    else:
+                        ok = False
+                    if ok:
+                        # time
+                        start_113 = pos
+                        end_115 = pos
+                        while end_115 < n and input[end_115] in _DIGITS:
+                            end_115 += 1
+                        ok = end_115 > pos
+                        if ok:
+                            first_116 = pos
+                            while first_116 < end_115 - 1 and input[first_116] == "0":
+                                first_116 += 1
+                            ok = end_115 - first_116 <= 2
+                            if ok:
+                                hour_114 = int(input[first_116:end_115])
+                                ok = 1 <= hour_114 < 13
+                            pos = end_115
+                        if ok:
+                            if input[pos:pos + 1] == ':':
+                                pos += 1
+                                ok = True
+                            else:
+                                ok = False
+                            if ok:
+                                end_119 = pos
+                                while end_119 < n and input[end_119] in _DIGITS:
+                                    end_119 += 1
+                                ok = end_119 > pos
+                                if ok:
+                                    first_120 = pos
+                                    while first_120 < end_119 - 1 and input[first_120] == "0":
+                                        first_120 += 1
+                                    ok = end_119 - first_120 <= 2
+                                    if ok:
+                                        minute_118 = int(input[first_120:end_119])
+                                        ok = 0 <= minute_118 < 60
+                                    pos = end_119
+                                if ok:
+                                    if input[pos:pos + 1] == ' ':
+                                        pos += 1
+                                        ok = True
+                                    else:
+                                        ok = False
+                                    if ok:
+                                        pm_122 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                                        ok = pm_122 is not None
+                                        if ok:
+                                            pos += 2
+                                        if ok:
+                                            open_time_112 = _TIMES[(hour_114 % 12 + pm_122)*60 + minute_118]
+                        if not ok:
+                            pos = start_113
+                            end_124 = pos
+                            while end_124 < n and input[end_124] in _DIGITS:
+                                end_124 += 1
+                            ok = end_124 > pos
+                            if ok:
+                                first_125 = pos
+                                while first_125 < end_124 - 1 and input[first_125] == "0":
+                                    first_125 += 1
+                                ok = end_124 - first_125 <= 2
+                                if ok:
+                                    hour_123 = int(input[first_125:end_124])
+                                    ok = 1 <= hour_123 < 13
+                                pos = end_124
+                            if ok:
+                                if input[pos:pos + 1] == ' ':
+                                    pos += 1
+                                    ok = True
+                                else:
+                                    ok = False
+                                if ok:
+                                    pm_127 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                                    ok = pm_127 is not None
+                                    if ok:
+                                        pos += 2
+                                    if ok:
+                                        open_time_112 = _TIMES[(hour_123 % 12 + pm_127)*60]
+                            if not ok:
+                                pos = start_113
+                                if input.startswith('noon', pos):
+                                    pos += 4
+                                    ok = True
+                                else:
+                                    ok = False
+                                if ok:
+                                    open_time_112 = _TIMES[12*60]
+                                if not ok:
+                                    pos = start_113
+                                    if input.startswith('midnight', pos):
+                                        pos += 8
+                                        ok = True
+                                    else:
+                                        ok = False
+                                    if ok:
+                                        open_time_112 = _TIMES[0]
+                        if ok:
+                            start_131 = pos
+                            if input.startswith(' - ', pos):
+                                pos += 3
+                                ok = True
+                            else:
+                                ok = False
+                            if not ok:
+                                pos = start_131
+                                if input.startswith(' – ', pos):
+                                    pos += 3
+                                    ok = True
+                                else:
+                                    ok = False
+                            if ok:
+                                # time
+                                start_133 = pos
+                                end_135 = pos
+                                while end_135 < n and input[end_135] in _DIGITS:
+                                    end_135 += 1
+                                ok = end_135 > pos
+                                if ok:
+                                    first_136 = pos
+                                    while first_136 < end_135 - 1 and input[first_136] == "0":
+                                        first_136 += 1
+                                    ok = end_135 - first_136 <= 2
+                                    if ok:
+                                        hour_134 = int(input[first_136:end_135])
+                                        ok = 1 <= hour_134 < 13
+                                    pos = end_135
+                                if ok:
+                                    if input[pos:pos + 1] == ':':
+                                        pos += 1
+                                        ok = True
+                                    else:
+                                        ok = False
+                                    if ok:
+                                        end_139 = pos
+                                        while end_139 < n and input[end_139] in _DIGITS:
+                                            end_139 += 1
+                                        ok = end_139 > pos
+                                        if ok:
+                                            first_140 = pos
+                                            while first_140 < end_139 - 1 and input[first_140] == "0":
+                                                first_140 += 1
+                                            ok = end_139 - first_140 <= 2
+                                            if ok:
+                                                minute_138 = int(input[first_140:end_139])
+                                                ok = 0 <= minute_138 < 60
+                                            pos = end_139
+                                        if ok:
+                                            if input[pos:pos + 1] == ' ':
+                                                pos += 1
+                                                ok = True
+                                            else:
+                                                ok = False
+                                            if ok:
+                                                pm_142 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                                                ok = pm_142 is not None
+                                                if ok:
+                                                    pos += 2
+                                                if ok:
+                                                    close_time_132 = _TIMES[(hour_134 % 12 + pm_142)*60 + minute_138]
+                                if not ok:
+                                    pos = start_133
+                                    end_144 = pos
+                                    while end_144 < n and input[end_144] in _DIGITS:
+                                        end_144 += 1
+                                    ok = end_144 > pos
+                                    if ok:
+                                        first_145 = pos
+                                        while first_145 < end_144 - 1 and input[first_145] == "0":
+                                            first_145 += 1
+                                        ok = end_144 - first_145 <= 2
+                                        if ok:
+                                            hour_143 = int(input[first_145:end_144])
+                                            ok = 1 <= hour_143 < 13
+                                        pos = end_144
+                                    if ok:
+                                        if input[pos:pos + 1] == ' ':
+                                            pos += 1
+                                            ok = True
+                                        else:
+                                            ok = False
+                                        if ok:
+                                            pm_147 = _MERIDIEM_HOURS.get(input[pos:pos + 2])
+                                            ok = pm_147 is not None
+                                            if ok:
+                                                pos += 2
+                                            if ok:
+                                                close_time_132 = _TIMES[(hour_143 % 12 + pm_147)*60]
+                                    if not ok:
+                                        pos = start_133
+                                        if input.startswith('noon', pos):
+                                            pos += 4
+                                            ok = True
+                                        else:
+                                            ok = False
+                                        if ok:
+                                            close_time_132 = _TIMES[12*60]
+                                        if not ok:
+                                            pos = start_133
+                                            if input.startswith('midnight', pos):
+                                                pos += 8
+                                                ok = True
+                                            else:
+                                                ok = False
+                                            if ok:
+                                                close_time_132 = _TIMES[0]
+                                if ok:
+                                    item_2 = {"days": days_96, "open_time": open_time_112, "close_time": close_time_132}
+                if not ok:
+                    pos = start_95
+                    # days
+                    # day_item
+                    start_153 = pos
+                    # day_range
+                    start_154 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                    ok = start_154 is not None
+                    if ok:
+                        pos += 3
+                    if ok:
+                        start_156 = pos
+                        if input[pos:pos + 1] == '-':
+                            pos += 1
+                            ok = True
+                        else:
+                            ok = False
+                        if not ok:
+                            pos = start_156
+                            if input[pos:pos + 1] == '–':
+                                pos += 1
+                                ok = True
+                            else:
+                                ok = False
+                        if ok:
+                            end_157 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                            ok = end_157 is not None
+                            if ok:
+                                pos += 3
+                            if ok:
+                                item_151 = _DAY_RANGE_MASKS[start_154][end_157]
+                    if not ok:
+                        pos = start_153
+                        # weekday
+                        day_num_158 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                        ok = day_num_158 is not None
+                        if ok:
+                            pos += 3
+                        if ok:
+                            item_151 = 1 << day_num_158
+                    if ok:
+                        days_150 = item_151
+                        while True:
+                            save_152 = pos
+                            if input.startswith(', ', pos):
+                                pos += 2
+                                ok = True
+                            else:
+                                ok = False
+                            if ok:
+                                # day_item
+                                start_159 = pos
+                                # day_range
+                                start_160 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                ok = start_160 is not None
+                                if ok:
+                                    pos += 3
+                                if ok:
+                                    start_162 = pos
+                                    if input[pos:pos + 1] == '-':
+                                        pos += 1
+                                        ok = True
+                                    else:
+                                        ok = False
+                                    if not ok:
+                                        pos = start_162
+                                        if input[pos:pos + 1] == '–':
+                                            pos += 1
+                                            ok = True
+                                        else:
+                                            ok = False
+                                    if ok:
+                                        end_163 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                        ok = end_163 is not None
+                                        if ok:
+                                            pos += 3
+                                        if ok:
+                                            item_151 = _DAY_RANGE_MASKS[start_160][end_163]
+                                if not ok:
+                                    pos = start_159
+                                    # weekday
+                                    day_num_164 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                    ok = day_num_164 is not None
+                                    if ok:
+                                        pos += 3
+                                    if ok:
+                                        item_151 = 1 << day_num_164
+                            if not ok:
+                                pos = save_152
+                                break
+                            days_150 |= item_151
+                        ok = True
+                    if ok:
+                        if input.startswith(' 24 hours', pos):
+                            pos += 9
+                            ok = True
+                        else:
+                            ok = False
+                        if ok:
+                            item_2 = {"days": days_150, "open_time": _TIMES[0], "close_time": _ONE_DAY}
+                if not ok:
+                    pos = start_94
+                    # closed
+                    if input.startswith('Closed ', pos):
+                        pos += 7
+                        ok = True
+                    else:
+                        ok = False
+                    if ok:
+                        # days
+                        # day_item
+                        start_170 = pos
+                        # day_range
+                        start_171 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                        ok = start_171 is not None
+                        if ok:
+                            pos += 3
+                        if ok:
+                            start_173 = pos
+                            if input[pos:pos + 1] == '-':
+                                pos += 1
+                                ok = True
+                            else:
+                                ok = False
+                            if not ok:
+                                pos = start_173
+                                if input[pos:pos + 1] == '–':
+                                    pos += 1
+                                    ok = True
+                                else:
+                                    ok = False
+                            if ok:
+                                end_174 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                ok = end_174 is not None
+                                if ok:
+                                    pos += 3
+                                if ok:
+                                    item_168 = _DAY_RANGE_MASKS[start_171][end_174]
+                        if not ok:
+                            pos = start_170
+                            # weekday
+                            day_num_175 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                            ok = day_num_175 is not None
+                            if ok:
+                                pos += 3
+                            if ok:
+                                item_168 = 1 << day_num_175
+                        if ok:
+                            days_167 = item_168
+                            while True:
+                                save_169 = pos
+                                if input.startswith(', ', pos):
+                                    pos += 2
+                                    ok = True
+                                else:
+                                    ok = False
+                                if ok:
+                                    # day_item
+                                    start_176 = pos
+                                    # day_range
+                                    start_177 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                    ok = start_177 is not None
+                                    if ok:
+                                        pos += 3
+                                    if ok:
+                                        start_179 = pos
+                                        if input[pos:pos + 1] == '-':
+                                            pos += 1
+                                            ok = True
+                                        else:
+                                            ok = False
+                                        if not ok:
+                                            pos = start_179
+                                            if input[pos:pos + 1] == '–':
+                                                pos += 1
+                                                ok = True
+                                            else:
+                                                ok = False
+                                        if ok:
+                                            end_180 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                            ok = end_180 is not None
+                                            if ok:
+                                                pos += 3
+                                            if ok:
+                                                item_168 = _DAY_RANGE_MASKS[start_177][end_180]
+                                    if not ok:
+                                        pos = start_176
+                                        # weekday
+                                        day_num_181 = _WEEKDAY_NUMBERS.get(input[pos:pos + 3])
+                                        ok = day_num_181 is not None
+                                        if ok:
+                                            pos += 3
+                                        if ok:
+                                            item_168 = 1 << day_num_181
+                                if not ok:
+                                    pos = save_169
+                                    break
+                                days_167 |= item_168
+                            ok = True
+                        if ok:
+                            item_2 = {"closed": days_167}
+                    if not ok:
+                        pos = start_94
+                        # every_day
+                        if input.startswith('24 hours', pos):
+                            pos += 8
+                            ok = True
+                        else:
+                            ok = False
+                        if ok:
+                            item_2 = {"days": 0b1111111, "open_time": _TIMES[0], "close_time": _ONE_DAY}
+            if not ok:
+                pos = save_3
+                break
+            segments_1.append(item_2)
+        ok = True
+    if ok:
+        result = remove_closed_days(segments_1)
+    if ok:
+        return (result, input[pos:])
+    return None
+
+
+def parse(input):
+    if result := parse_schedule(input):
+        (schedule, rest) = result
+        return (expand_schedule(schedule), rest)
+
+    return None
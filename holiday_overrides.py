@@ -0,0 +1,228 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from restaurant_index import load_index
+from row_sources import rows
+
+
+MINUTES_PER_DAY = 24*60
+
+
+def _minute_of_day(text):
+    (hour, minute) = text.split(":")
+    return int(hour)*60 + int(minute)
+
+
+class HolidayOverrides:
+    # Dated exceptions to the weekly hours. On a date with an override, a
+    # restaurant is open only during that date's override intervals (none
+    # at all for a closure) from midnight to midnight, whatever its weekly
+    # hours say; every other date keeps the weekly hours.
+    def __init__(self, overrides=()):
+        # overrides are (name, date, open minute, close minute) with both
+        # minutes None for a closure; several rows for a name and date add
+        # up. A close minute of 0 or at/before the open minute means
+        # midnight at the end of the date.
+        by_date = {}
+        for (name, day, open_minute, close_minute) in overrides:
+            intervals = by_date.setdefault(day, {}).setdefault(name, [])
+
+            if open_minute is not None:
+                if close_minute <= open_minute:
+                    close_minute = MINUTES_PER_DAY
+                intervals.append((open_minute, close_minute))
+
+        self._by_date = {
+            day: {
+                name: tuple(sorted(intervals))
+                for (name, intervals) in names.items()
+            }
+            for (day, names) in by_date.items()
+        }
+        # Calendar-date index for range queries
+        self._dates = sorted(self._by_date)
+
+    def __len__(self):
+        return len(self._dates)
+
+    def on(self, day):
+        # {name: intervals} for the date, or None when nothing is overridden
+        return self._by_date.get(day)
+
+    def between(self, start_date, end_date):
+        # [(date, {name: intervals})] for dates from start_date to end_date
+        # inclusive, in date order
+        lo = bisect_left(self._dates, start_date)
+        hi = bisect_right(self._dates, end_date)
+
+        return [(day, self._by_date[day]) for day in self._dates[lo:hi]]
+
+
+def load_overrides(source):
+    # Rows of name, ISO date, and open and close times as HH:MM, both empty
+    # for a closure
+    return HolidayOverrides(
+        (
+            name,
+            date.fromisoformat(day),
+            _minute_of_day(open_time) if open_time else None,
+            _minute_of_day(close_time) if close_time else None
+        )
+        for (name, day, open_time, close_time) in rows(source)
+    )
+
+
+class OverriddenIndex:
+    # A RestaurantIndex with holiday overrides on top
+    def __init__(self, index, overrides):
+        self.index = index
+        self.overrides = overrides
+
+        # Ids of the restaurants each override names, found once. Names
+        # the index doesn't have map to nothing; names several
+        # restaurants share map to all of them.
+        override_names = {
+            name
+            for (_, day_overrides) in overrides.between(date.min, date.max)
+            for name in day_overrides
+        }
+        self._ids_by_name = {}
+        for (restaurant_id, name) in enumerate(index.names()):
+            if name in override_names:
+                self._ids_by_name.setdefault(name, []).append(restaurant_id)
+
+    def open_restaurants(self, search_datetime, offset=0, limit=None):
+        day_overrides = self.overrides.on(search_datetime.date())
+
+        # The usual case: one dict lookup on top of the weekly index
+        if day_overrides is None:
+            return self.index.open_restaurants(search_datetime, offset, limit)
+
+        minute = search_datetime.hour*60 + search_datetime.minute
+        open_ids = [
+            restaurant_id
+            for restaurant_id in self.index.open_ids(search_datetime)
+            if self.index.name(restaurant_id) not in day_overrides
+        ] + [
+            restaurant_id
+            for (name, intervals) in day_overrides.items()
+            if any(
+                open_minute <= minute < close_minute
+                for (open_minute, close_minute) in intervals
+            )
+            for restaurant_id in self._ids_by_name.get(name, ())
+        ]
+
+        # Ids are in alphabetical order
+        open_ids.sort()
+        end = None if limit is None else offset + limit
+
+        return [
+            self.index.name(restaurant_id)
+            for restaurant_id in open_ids[offset:end]
+        ]
+
+    def overridden_between(self, start_date, end_date):
+        # Restaurants with an override from start_date to end_date, e.g. to
+        # warn customers ahead of a holiday week
+        return sorted(
+            {
+                name
+                for (_, day_overrides) in self.overrides.between(
+                    start_date,
+                    end_date
+                )
+                for name in day_overrides
+            },
+            key=str.casefold
+        )
+
+
+def load_overridden_index(source, overrides_source):
+    return OverriddenIndex(
+        load_index(source),
+        load_overrides(overrides_source)
+    )
+
+
+def _test_holiday_overrides():
+    index = load_index("rest_hours.csv")
+    overrides = load_overrides([
+        ("Kushi Tsuru", "2020-12-25", "", ""),
+        ("The Stinking Rose", "2020-12-25", "18:00", "22:00"),
+        ("The Stinking Rose", "2020-12-25", "09:00", "10:00"),
+        ("Osakaya Restaurant", "2020-12-31", "20:00", "00:00")
+    ])
+    overridden = OverriddenIndex(index, overrides)
+
+    # Dates without overrides give exactly the weekly answer
+    ordinary = datetime(2020, 12, 24, 13, 0)
+    assert overridden.open_restaurants(ordinary) == \
+        index.open_restaurants(ordinary)
+
+    christmas_lunch = datetime(2020, 12, 25, 13, 0)
+    weekly = index.open_restaurants(christmas_lunch)
+    assert "Kushi Tsuru" in weekly
+    assert "The Stinking Rose" in weekly
+
+    result = overridden.open_restaurants(christmas_lunch)
+    assert "Kushi Tsuru" not in result
+    assert "The Stinking Rose" not in result
+    assert set(result) == set(weekly) - {"Kushi Tsuru", "The Stinking Rose"}
+
+    # Override hours apply even outside the weekly hours
+    assert "The Stinking Rose" in overridden.open_restaurants(
+        datetime(2020, 12, 25, 9, 30)
+    )
+    christmas_evening = overridden.open_restaurants(
+        datetime(2020, 12, 25, 21, 0)
+    )
+    assert "The Stinking Rose" in christmas_evening
+    assert christmas_evening == sorted(christmas_evening, key=str.casefold)
+
+    # Closing at 00:00 runs to midnight
+    assert "Osakaya Restaurant" in overridden.open_restaurants(
+        datetime(2020, 12, 31, 23, 59)
+    )
+
+    for (start_date, end_date, names) in [
+        (date(2020, 12, 20), date(2020, 12, 26),
+         ["Kushi Tsuru", "The Stinking Rose"]),
+        (date(2020, 12, 26), date(2020, 12, 31), ["Osakaya Restaurant"]),
+        (date(2021, 1, 1), date(2021, 12, 31), [])
+    ]:
+        assert overridden.overridden_between(start_date, end_date) == names
+    assert len(overrides) == 2
+
+    # Pages of an overridden date are slices of the full answer
+    for offset in range(0, len(christmas_evening) + 5, 4):
+        assert overridden.open_restaurants(
+            datetime(2020, 12, 25, 21, 0),
+            offset,
+            4
+        ) == christmas_evening[offset:offset + 4]
+
+
+def _test_override_names():
+    index = load_index([
+        ["Twin Diner", "Mon-Sun 11 am - 10 pm"],
+        ["Corner Cafe", "Mon-Sun 7 am - 3 pm"],
+        ["Twin Diner", "Mon-Sun 5 pm - 11 pm"]
+    ])
+    overridden = OverriddenIndex(index, load_overrides([
+        ("Nowhere Grill", "2020-12-25", "00:00", "00:00"),
+        ("Twin Diner", "2020-12-25", "12:00", "14:00")
+    ]))
+
+    # An override for a restaurant the index doesn't have opens nothing
+    assert overridden.open_restaurants(datetime(2020, 12, 25, 9, 0)) == \
+        ["Corner Cafe"]
+
+    # Restaurants sharing a name each keep their own entry
+    assert overridden.open_restaurants(datetime(2020, 12, 25, 13, 0)) == \
+        ["Corner Cafe", "Twin Diner", "Twin Diner"]
+    assert overridden.open_restaurants(datetime(2020, 12, 25, 20, 0)) == []
+
+
+if __name__ == "__main__":
+    _test_holiday_overrides()
+    _test_override_names()
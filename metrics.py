@@ -0,0 +1,260 @@
+from bisect import bisect_left
+from time import perf_counter
+# threading.Lock is this same lock; importing threading itself would cost
+# the CLI's cold start several milliseconds
+from _thread import allocate_lock as Lock
+
+
+# Upper bounds in seconds, from a microsecond-long parse to a slow load
+DEFAULT_BUCKETS = (
+    1e-6, 5e-6,
+    1e-5, 5e-5,
+    1e-4, 5e-4,
+    1e-3, 5e-3,
+    1e-2, 5e-2,
+    0.1, 0.5,
+    1.0, 5.0,
+    10.0
+)
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return {
+            "type": "counter",
+            "value": self.value
+        }
+
+    def prometheus_lines(self):
+        return [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} counter".format(self.name),
+            "{} {}".format(self.name, _format_value(self.value))
+        ]
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus the +Inf overflow
+        self.counts = [0]*(len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = Lock()
+
+    def observe(self, value):
+        # Bucket bounds are inclusive, as in Prometheus
+        i = bisect_left(self.buckets, value)
+
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def _cumulative(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+
+        return (cumulative, total)
+
+    def snapshot(self):
+        (cumulative, total) = self._cumulative()
+
+        return {
+            "type": "histogram",
+            "buckets": dict(zip(self.buckets + (float("inf"),), cumulative)),
+            "sum": total,
+            "count": cumulative[-1]
+        }
+
+    def prometheus_lines(self):
+        (cumulative, total) = self._cumulative()
+
+        lines = [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} histogram".format(self.name)
+        ]
+        for (bound, count) in zip(self.buckets + (float("inf"),), cumulative):
+            lines.append('{}_bucket{{le="{}"}} {}'.format(
+                self.name,
+                _format_value(bound),
+                count
+            ))
+        lines.append("{}_sum {}".format(self.name, _format_value(total)))
+        lines.append("{}_count {}".format(self.name, cumulative[-1]))
+
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(perf_counter() - self.start)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = Lock()
+
+    def _register(self, name, make):
+        with self._lock:
+            # Registering twice hands back the existing metric
+            if name not in self.metrics:
+                self.metrics[name] = make()
+
+            return self.metrics[name]
+
+    def counter(self, name, help):
+        return self._register(name, lambda: Counter(name, help))
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        return self._register(name, lambda: Histogram(name, help, buckets))
+
+    def snapshot(self):
+        return {
+            name: metric.snapshot()
+            for (name, metric) in self.metrics.items()
+        }
+
+    def to_prometheus(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.prometheus_lines()
+
+        return "\n".join(lines) + "\n"
+
+
+# The registry the loader and query path report to
+REGISTRY = Registry()
+
+
+def _test_counter():
+    counter = Counter("things_total", "Things")
+    counter.inc()
+    counter.inc(2)
+
+    assert counter.snapshot() == {
+        "type": "counter",
+        "value": 3
+    }
+    assert counter.prometheus_lines() == [
+        "# HELP things_total Things",
+        "# TYPE things_total counter",
+        "things_total 3"
+    ]
+
+
+def _test_histogram():
+    histogram = Histogram("wait_seconds", "Waits", buckets=(0.1, 1.0))
+
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {
+        0.1: 2,
+        1.0: 3,
+        float("inf"): 4
+    }
+    assert snapshot["count"] == 4
+    assert abs(snapshot["sum"] - 2.65) < 1e-9
+
+    assert histogram.prometheus_lines() == [
+        "# HELP wait_seconds Waits",
+        "# TYPE wait_seconds histogram",
+        'wait_seconds_bucket{le="0.1"} 2',
+        'wait_seconds_bucket{le="1.0"} 3',
+        'wait_seconds_bucket{le="+Inf"} 4',
+        "wait_seconds_sum " + repr(snapshot["sum"]),
+        "wait_seconds_count 4"
+    ]
+
+    with histogram.time():
+        pass
+    assert histogram.count == 5
+
+
+def _test_registry():
+    registry = Registry()
+    counter = registry.counter("a_total", "A")
+    histogram = registry.histogram("b_seconds", "B")
+
+    assert registry.counter("a_total", "A") is counter
+    assert registry.histogram("b_seconds", "B") is histogram
+    assert set(registry.snapshot()) == {"a_total", "b_seconds"}
+
+    text = registry.to_prometheus()
+    assert text.endswith("\n")
+    assert "# TYPE a_total counter\n" in text
+    assert 'b_seconds_bucket{le="+Inf"} 0\n' in text
+
+
+def _test_instrumentation():
+    from datetime import datetime
+    from restaurant_index import load_index
+    # The instrumented modules report to the imported module's registry,
+    # which is not this one when this file runs as __main__
+    from metrics import REGISTRY as registry
+
+    parses = registry.histogram("restaurants_parse_seconds", "")
+    hits = registry.counter("restaurants_query_cache_hits_total", "")
+    misses = registry.counter("restaurants_query_cache_misses_total", "")
+    before = parses.count
+    (hits_before, misses_before) = (hits.value, misses.value)
+
+    index = load_index("rest_hours.csv")
+    for _ in range(3):
+        index.open_restaurants(datetime(2020, 11, 14, 13, 45))
+
+    snapshot = registry.snapshot()
+    assert parses.count - before == len(index)
+    assert snapshot["restaurants_csv_read_seconds"]["count"] >= len(index)
+    assert snapshot["restaurants_index_build_seconds"]["count"] >= 1
+    assert snapshot["restaurants_query_seconds"]["count"] >= 1
+
+    # Query cache hits and misses match the index's own cache
+    assert misses.value - misses_before == index.cache_info().misses == 1
+    assert hits.value - hits_before == index.cache_info().hits == 2
+
+
+if __name__ == "__main__":
+    _test_counter()
+    _test_histogram()
+    _test_registry()
+    _test_instrumentation()
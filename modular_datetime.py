@@ -1,5 +1,5 @@
+from array import array
 from mod import Mod
-from datetime import datetime
 
 
 class DatetimeModWeek:
@@ -108,7 +108,123 @@ def _test_datetime_in_range():
         ) == False
 
 
+# Packed schedules
+# Hours only need minute resolution, and a week has 10080 minutes, so an
+# interval fits in two uint16 minute-of-week values instead of two Mods.
+SECONDS_PER_WEEK = 7*24*60*60
+MINUTES_PER_DAY = 24*60
+MINUTES_PER_WEEK = 7*MINUTES_PER_DAY
+
+
+def to_minute_of_week(datetime_mod):
+    return int(datetime_mod) // 60
+
+
+def from_minute_of_week(minute):
+    return Mod(minute*60, SECONDS_PER_WEEK)
+
+
+def pack_hours(hours_datetimes):
+    # Open and close minutes, alternating
+    packed = array("H")
+    for hour_range in hours_datetimes:
+        packed.append(to_minute_of_week(hour_range["open_datetime"]))
+        packed.append(to_minute_of_week(hour_range["close_datetime"]))
+
+    return packed
+
+
+def unpack_hours(packed):
+    return [
+        {
+            "open_datetime": from_minute_of_week(packed[i]),
+            "close_datetime": from_minute_of_week(packed[i + 1])
+        }
+        for i in range(0, len(packed), 2)
+    ]
+
+
+def compress_hours(hours_datetimes):
+    # Run-length encodes the weekly pattern: intervals that open at the same
+    # time of day and last as long collapse into one (day mask, open minute
+    # of the day, length in minutes) record, so "Mon-Sun 11 am - 10 pm" is
+    # one record rather than seven intervals
+    masks = {}
+    for hour_range in hours_datetimes:
+        open_minute = to_minute_of_week(hour_range["open_datetime"])
+        close_minute = to_minute_of_week(hour_range["close_datetime"])
+        (day, minute_of_day) = divmod(open_minute, MINUTES_PER_DAY)
+        length = (close_minute - open_minute) % MINUTES_PER_WEEK
+
+        key = (minute_of_day, length)
+        masks[key] = masks.get(key, 0) | 1 << day
+
+    compressed = array("H")
+    for ((minute_of_day, length), mask) in masks.items():
+        compressed += array("H", [mask, minute_of_day, length])
+
+    return compressed
+
+
+def decompress_hours(compressed):
+    # Intervals come back grouped by record, each record's days in week
+    # order
+    hours = []
+    for i in range(0, len(compressed), 3):
+        (mask, minute_of_day, length) = compressed[i:i + 3]
+
+        for day in range(7):
+            if mask >> day & 1:
+                open_minute = day*MINUTES_PER_DAY + minute_of_day
+                hours.append({
+                    "open_datetime": from_minute_of_week(open_minute),
+                    "close_datetime": from_minute_of_week(
+                        (open_minute + length) % MINUTES_PER_WEEK
+                    )
+                })
+
+    return hours
+
+
+def _test_packed_hours():
+    from open_hours_parser import parse
+
+    def key(hour_range):
+        return (
+            int(hour_range["open_datetime"]),
+            int(hour_range["close_datetime"])
+        )
+
+    for input in [
+        "Mon-Sun 11 am - 10 pm",
+        "Mon-Thu, Sun 11:30 am - 10 pm  / Fri-Sat 11:30 am - 11 pm",
+        "Sat-Sun 5 pm - 2:30 am",
+        "Sun 11 pm - 1 am",
+        "Mon 9 am - 9 am"
+    ]:
+        (hours, _) = parse(input)
+
+        packed = pack_hours(hours)
+        assert packed.itemsize == 2
+        assert len(packed) == 2*len(hours)
+        assert unpack_hours(packed) == hours
+
+        compressed = compress_hours(hours)
+        assert sorted(map(key, decompress_hours(compressed))) == \
+            sorted(map(key, hours))
+
+    # Every day alike collapses to a single record
+    (hours, _) = parse("Mon-Sun 11 am - 10 pm")
+    assert list(compress_hours(hours)) == [0b1111111, 11*60, 11*60]
+
+    # Wrapping past the end of the week keeps its length
+    (hours, _) = parse("Sun 11 pm - 1 am")
+    assert list(compress_hours(hours)) == [0b1000000, 23*60, 2*60]
+    assert to_minute_of_week(hours[0]["close_datetime"]) == 60
+
+
 # Tests
 if __name__ == "__main__":
     _test_modular_datetime()
-    _test_datetime_in_range()
\ No newline at end of file
+    _test_datetime_in_range()
+    _test_packed_hours()
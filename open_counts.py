@@ -0,0 +1,163 @@
+from array import array
+from itertools import accumulate
+from find_open_restaurants import load_restaurants
+from modular_datetime import MINUTES_PER_WEEK, to_minute_of_week
+from restaurant_index import minute_of_week
+
+
+def _open_segments(hours_datetimes):
+    # The minutes a restaurant is open as sorted, non-overlapping
+    # [start, end) segments within one week. Ranges that wrap past Sunday
+    # are split in two, and overlapping ranges merged so a restaurant is
+    # never counted twice.
+    segments = []
+    for hour_range in hours_datetimes:
+        start = to_minute_of_week(hour_range["open_datetime"])
+        length = (
+            to_minute_of_week(hour_range["close_datetime"]) - start
+        ) % MINUTES_PER_WEEK
+        end = start + length
+
+        if end > MINUTES_PER_WEEK:
+            segments += [
+                (start, MINUTES_PER_WEEK),
+                (0, end - MINUTES_PER_WEEK)
+            ]
+        elif length:
+            segments.append((start, end))
+
+    merged = []
+    for (start, end) in sorted(segments):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def _counts_per_minute(restaurants):
+    # Difference array: +1 where a restaurant opens, -1 where it closes;
+    # its running sum is the number open at each minute
+    changes = [0]*(MINUTES_PER_WEEK + 1)
+    for rest in restaurants:
+        for (start, end) in _open_segments(rest["hours_datetimes"]):
+            changes[start] += 1
+            changes[end] -= 1
+
+    return array("I", accumulate(changes[:MINUTES_PER_WEEK]))
+
+
+class OpenCounts:
+    # Number of restaurants open at every minute of the week, overall and
+    # per area, so counting is a lookup rather than a scan
+    def __init__(self, restaurants, area_column=None):
+        restaurants = list(restaurants)
+        self._total = _counts_per_minute(restaurants)
+
+        areas = {}
+        if area_column is not None:
+            for rest in restaurants:
+                area = rest.get("columns", {}).get(area_column)
+                areas.setdefault(area, []).append(rest)
+
+        self._areas = {
+            area: _counts_per_minute(area_restaurants)
+            for (area, area_restaurants) in areas.items()
+        }
+
+    def areas(self):
+        return list(self._areas)
+
+    def count_open(self, search_datetime, area=None):
+        minute = minute_of_week(search_datetime)
+
+        if area is None:
+            return self._total[minute]
+
+        counts = self._areas.get(area)
+        return counts[minute] if counts is not None else 0
+
+    def any_open(self, search_datetime, area=None):
+        return self.count_open(search_datetime, area) > 0
+
+    def counts_by_area(self, search_datetime):
+        minute = minute_of_week(search_datetime)
+
+        return {
+            area: counts[minute]
+            for (area, counts) in self._areas.items()
+        }
+
+
+def load_open_counts(source, extra_columns=(), area_column=None):
+    return OpenCounts(load_restaurants(source, extra_columns), area_column)
+
+
+def _test_open_segments():
+    from find_open_restaurants import parse_restaurant
+
+    def segments(hours_string):
+        return _open_segments(
+            parse_restaurant("", hours_string)["hours_datetimes"]
+        )
+
+    assert segments("Mon 9 am - 12 pm  / Mon 11 am - 5 pm") == [
+        (9*60, 17*60)
+    ]
+    # Wraps past Sunday
+    assert segments("Sun 11 pm - 1 am") == [
+        (0, 60),
+        ((6*24 + 23)*60, MINUTES_PER_WEEK)
+    ]
+    # Adjacent days join up
+    assert segments("Mon-Sun 24 hours") == [(0, MINUTES_PER_WEEK)]
+    # Closing when it opens is never open
+    assert segments("Mon 9 am - 9 am") == []
+
+
+def _test_open_counts():
+    from datetime import datetime, timedelta
+    from find_open_restaurants import parse_restaurant
+    from restaurant_index import RestaurantIndex
+
+    restaurants = load_restaurants("rest_hours.csv")
+    for (i, rest) in enumerate(restaurants):
+        rest["columns"] = {"area": "north" if i % 3 else "south"}
+
+    index = RestaurantIndex(restaurants)
+    counts = OpenCounts(restaurants, area_column="area")
+    areas = {
+        area: RestaurantIndex([
+            rest for rest in restaurants
+            if rest["columns"]["area"] == area
+        ])
+        for area in ["north", "south"]
+    }
+
+    assert sorted(counts.areas()) == ["north", "south"]
+
+    monday = datetime(2020, 11, 16)
+    for minute in range(0, MINUTES_PER_WEEK, 13):
+        search_datetime = monday + timedelta(minutes=minute)
+        expected = len(index.open_restaurants(search_datetime))
+
+        assert counts.count_open(search_datetime) == expected
+        assert counts.any_open(search_datetime) == (expected > 0)
+        assert counts.counts_by_area(search_datetime) == {
+            area: len(area_index.open_restaurants(search_datetime))
+            for (area, area_index) in areas.items()
+        }
+
+    assert counts.count_open(monday, area="nowhere") == 0
+
+    # Overlapping ranges count once
+    overlap = OpenCounts([
+        parse_restaurant("Cafe", "Mon 9 am - 12 pm  / Mon 11 am - 5 pm")
+    ])
+    assert overlap.count_open(datetime(2020, 11, 16, 11, 30)) == 1
+
+
+if __name__ == "__main__":
+    _test_open_segments()
+    _test_open_counts()
@@ -1,23 +1,230 @@
-import calendar
+import time
+from contextvars import ContextVar
 from modular_datetime import DatetimeModWeek, datetime_in_range
-from string import printable, digits
+
+
+# Lookup tables, built once at import rather than on every call
+_WEEKDAY_NUMBERS = {
+    abbr: day_num
+    for (day_num, abbr) in enumerate(
+        ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    )
+}
+_WEEKDAY_DATETIMES = [DatetimeModWeek(day_num, 0, 0) for day_num in range(7)]
+_ONE_DAY = DatetimeModWeek(1, 0, 0)
+_IS_PM = {
+    "am": False,
+    "pm": True
+}
+
+
+# Day sets
+# A set of weekdays is a 7-bit mask, bit 0 for Monday through bit 6 for
+# Sunday, so ranges and unions are bitwise operations.
+_ALL_DAYS = 0b1111111
+
+
+def _days_mask(day_nums):
+    mask = 0
+    for day_num in day_nums:
+        mask |= 1 << day_num
+
+    return mask
+
+
+# The days in each mask, in week order
+_MASK_DAYS = [
+    tuple(day_num for day_num in range(7) if mask >> day_num & 1)
+    for mask in range(_ALL_DAYS + 1)
+]
+
+
+# Failure tracking
+# Only switched on while diagnosing a row that has already failed, so the
+# normal parse path pays for one context variable lookup per failure.
+# A context variable keeps concurrent threads and tasks apart.
+_tracker = ContextVar("tracker", default=None)
+
+
+class _FailureTracker:
+    def __init__(self):
+        self.remaining = None
+        self.expected = set()
+
+    def record(self, input, expected):
+        # The furthest failure is the one with the least input remaining
+        if self.remaining is None or len(input) < self.remaining:
+            self.remaining = len(input)
+            self.expected = {expected}
+        elif len(input) == self.remaining:
+            self.expected.add(expected)
+
+
+def _fail(input, expected):
+    if tracker := _tracker.get():
+        tracker.record(input, expected)
+
+    return None
+
+
+# Parse budgets
+# Every combinator step is charged to the active budget, if any. Running out
+# unwinds the whole parse at once; parse() turns that into BUDGET_EXCEEDED.
+_budget = ContextVar("budget", default=None)
+
+
+class _BudgetExceeded:
+    # Distinct from every parse result: falsy like a failure, and not a
+    # pair, so it can never be unpacked as (data, rest) by mistake
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "BUDGET_EXCEEDED"
+
+
+BUDGET_EXCEEDED = _BudgetExceeded()
+
+
+# Checking the clock is far dearer than counting, so only every Nth step
+_STEPS_PER_CLOCK_CHECK = 64
+
+
+class _BudgetExhausted(Exception):
+    pass
+
+
+class ParseBudget:
+    def __init__(self, max_steps=None, max_seconds=None):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.steps = 0
+        self.deadline = None
+
+    def start(self):
+        self.steps = 0
+
+        if self.max_seconds is not None:
+            self.deadline = time.perf_counter() + self.max_seconds
+
+    def spend(self):
+        self.steps += 1
+
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise _BudgetExhausted()
+
+        if (
+            self.deadline is not None
+            and self.steps % _STEPS_PER_CLOCK_CHECK == 0
+            and time.perf_counter() > self.deadline
+        ):
+            raise _BudgetExhausted()
+
+
+# Long inputs
+# Parsers hand on the rest of their input by slicing off what they
+# matched. On a str every slice copies everything left, which makes long
+# inputs quadratic, so past _VIEW_LENGTH characters parse_schedule() wraps
+# the input in a _Rest: a view whose open-ended slices just move a
+# position. Below it, plain str slicing is faster.
+_VIEW_LENGTH = 256
+
+
+class _Rest:
+    __slots__ = ("text", "pos")
+
+    def __init__(self, text, pos=0):
+        self.text = text
+        self.pos = pos
+
+    def __len__(self):
+        return len(self.text) - self.pos
+
+    def __eq__(self, other):
+        return len(self) == len(other) and self.startswith(str(other))
+
+    __hash__ = None
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            if not 0 <= key < len(self):
+                raise IndexError("_Rest index out of range")
+            return self.text[self.pos + key]
+
+        start = min(self.pos + (key.start or 0), len(self.text))
+        # Slices that end somewhere are the few characters a parser looks
+        # at, so they are plain strings
+        if key.stop is not None:
+            return self.text[start:self.pos + key.stop]
+
+        return _Rest(self.text, start)
+
+    def startswith(self, prefix):
+        return self.text.startswith(prefix, self.pos)
+
+    def __str__(self):
+        return self.text[self.pos:]
+
+    def __repr__(self):
+        return "_Rest({!r})".format(str(self))
+
+
+def _test_rest():
+    text = "Mon, Tue 9 am"
+    rest = _Rest(text)
+
+    assert len(rest) == len(text)
+    assert rest == text and rest != "Mon"
+    assert rest[0] == "M" and rest[0:3] == "Mon" and rest[:1] == "M"
+
+    tail = rest[5:]
+    assert isinstance(tail, _Rest) and tail.text is text
+    assert tail == "Tue 9 am" and str(tail) == "Tue 9 am"
+    assert tail.startswith("Tue") and not tail.startswith("Mon")
+    assert tail[100:] == "" and len(tail[100:]) == 0
+
+    try:
+        tail[len(tail)]
+        assert False, "_Rest should raise IndexError past its end"
+    except IndexError:
+        pass
+
+
+# First-character sets
+# A parser's "first" attribute is the set of characters its input can start
+# with for it to succeed. Parsers that may match the empty string, or whose
+# first characters are unknown, have none. Combinators compute their sets
+# when they are built and use them to skip parsers that cannot match.
+def _first(parser):
+    return getattr(parser, "first", None)
+
+
+def _starts_like(grammar):
+    def decorate(parser):
+        parser.first = _first(grammar)
+        return parser
+
+    return decorate
 
 
 # Primitive parsers
 def _char(c):
     def char_lambda(input):
         if input == "":
-            return None
+            return _fail(input, repr(c))
 
         if input[0] == c:
             return ([], input[1:])
         else:
-            return None
+            return _fail(input, repr(c))
 
+    char_lambda.first = frozenset(c)
     return char_lambda
 
 
 def _test_char():
+    from string import printable
+
     fail_inputs = [
         "",
         "Mon"
@@ -41,7 +248,7 @@ def _test_char():
 
 def _numeral(input):
     if input == "":
-        return None
+        return _fail(input, "digit")
 
     if input[0] in "0123456789":
         return (
@@ -53,10 +260,15 @@ def _numeral(input):
             input[1:]
         )
     else:
-        return None
+        return _fail(input, "digit")
+
+
+_numeral.first = frozenset("0123456789")
 
 
 def _test_numeral():
+    from string import digits
+
     fail_inputs = [
         "",
         "a"
@@ -86,24 +298,30 @@ def _test_numeral():
 
 def _weekday(input):
     if input == "":
-        return None
-
-    if input[0:3] in list(calendar.day_abbr):
-        day_num = list(calendar.day_abbr).index(input[0:3])
+        return _fail(input, "weekday")
 
+    if (day_num := _WEEKDAY_NUMBERS.get(input[0:3])) is not None:
         return (
             [
                 {
-                    "days": [DatetimeModWeek(day_num, 0, 0)]
+                    "days": 1 << day_num
                 }
             ],
             input[3:],
         )
     else:
-        return None
+        return _fail(input, "weekday")
+
+
+_weekday.first = frozenset(abbr[0] for abbr in _WEEKDAY_NUMBERS)
 
 
 def _test_weekday():
+    import calendar
+
+    # The lookup table must agree with the C locale's abbreviations
+    assert list(_WEEKDAY_NUMBERS) == list(calendar.day_abbr)
+
     fail_inputs = [
         "",
         "notaweekday"
@@ -115,9 +333,7 @@ def _test_weekday():
         (data, rest) = _weekday(day)
         assert data == [
             {
-                "days": [
-                    DatetimeModWeek(index, 0, 0)
-                ]
+                "days": 1 << index
             }
         ]
         assert rest == ""
@@ -127,9 +343,7 @@ def _test_weekday():
         (data, rest) = _weekday(day + tail)
         assert data == [
             {
-                "days": [
-                    DatetimeModWeek(index, 0, 0)
-                ]
+                "days": 1 << index
             }
         ]
         assert rest == tail
@@ -138,9 +352,13 @@ def _test_weekday():
 # Combinators
 def _sequence(parsers):
     def sequence_lambda(rest):
+        budget = _budget.get()
         stack = []
 
         for parser in parsers:
+            if budget:
+                budget.spend()
+
             if result := parser(rest):
                 (data, rest) = result
 
@@ -150,6 +368,9 @@ def _sequence(parsers):
                 return None
 
         return (stack, rest)
+
+    if parsers:
+        sequence_lambda.first = _first(parsers[0])
     return sequence_lambda
 
 
@@ -171,22 +392,49 @@ def _test_sequence():
     (data, rest) = _sequence(parsers)(pass_input)
     assert data == [
         {
-            "days": [DatetimeModWeek(0, 0, 0)]
+            "days": _days_mask([0])
         },
         {
-            "days": [DatetimeModWeek(4, 0, 0)]
+            "days": _days_mask([4])
         }
     ]
     assert rest == ""
 
 
 def _either(parsers):
+    # Dispatch table from first character to the alternatives that can
+    # start with it, in their original order. Alternatives without a first
+    # set are tried whatever the character.
+    unknown = tuple(parser for parser in parsers if _first(parser) is None)
+    table = {}
+    for parser in parsers:
+        for c in _first(parser) or ():
+            table[c] = tuple(
+                candidate
+                for candidate in parsers
+                if candidate in unknown or c in _first(candidate)
+            )
+
     def _either_lambda(rest):
-        for parser in parsers:
+        budget = _budget.get()
+
+        if _tracker.get():
+            # Diagnosing: try everything so every expected token is recorded
+            candidates = parsers
+        else:
+            candidates = table.get(rest[:1], unknown)
+
+        for parser in candidates:
+            if budget:
+                budget.spend()
+
             if result := parser(rest):
                 return result
 
         return None
+
+    if not unknown:
+        _either_lambda.first = frozenset(table)
     return _either_lambda
 
 
@@ -212,19 +460,93 @@ def _test_either():
     (data, rest) = _either(parsers)(pass_second_input)
     assert data == [
         {
-            "days": [0]
+            "days": _days_mask([0])
         }
     ]
     assert rest == " "
 
 
+def _test_either_dispatch():
+    calls = []
+
+    def counting(parser, label):
+        def counting_lambda(input):
+            calls.append(label)
+            return parser(input)
+
+        counting_lambda.first = _first(parser)
+        return counting_lambda
+
+    parser = _either([
+        counting(_numeral, "numeral"),
+        counting(_weekday, "weekday")
+    ])
+    assert parser.first == _numeral.first | _weekday.first
+
+    # Alternatives that cannot match are never called
+    (data, rest) = parser("Mon")
+    assert rest == ""
+    assert calls == ["weekday"]
+
+    calls.clear()
+    assert parser("?") is None
+    assert parser("") is None
+    assert calls == []
+
+    # ...unless diagnosing a failure
+    tracker = _FailureTracker()
+    token = _tracker.set(tracker)
+    try:
+        assert parser("?") is None
+    finally:
+        _tracker.reset(token)
+    assert calls == ["numeral", "weekday"]
+    assert tracker.expected == {"digit", "weekday"}
+
+    # Alternatives without a first set are tried whatever the character
+    calls.clear()
+    parser = _either([
+        counting(_weekday, "weekday"),
+        counting(_sequence([]), "empty")
+    ])
+    assert _first(parser) is None
+    assert parser("?") == ([], "?")
+    assert calls == ["empty"]
+
+
+def _test_first_sets():
+    assert _char("-").first == {"-"}
+    assert _string("am").first == {"a"}
+    assert _days.first == {"M", "T", "W", "F", "S"}
+    assert _hour.first == _minute.first == _numeral.first
+    assert _time.first == _numeral.first | {"n", "m"}
+    assert _segment.first == _days.first | {"C", "2"}
+    assert _datetime.first == _days.first
+
+    # Parsers that may match nothing have no first set
+    assert _first(_n_or_more(_char("a"), 0)) is None
+    assert _n_or_more(_char("a"), 1).first == {"a"}
+    assert _first(_sequence([])) is None
+
+
 def _n_or_more(parser, n):
+    first = _first(parser)
+
     def n_or_more_lambda(rest):
+        budget = _budget.get()
+        # Stop without calling the parser once the next character rules it
+        # out, unless diagnosing
+        first_if_fast = None if _tracker.get() else first
         stack = []
         n_success = 0
 
         while True:
-            if result := parser(rest):
+            if budget:
+                budget.spend()
+
+            if (
+                first_if_fast is None or rest[:1] in first_if_fast
+            ) and (result := parser(rest)):
                 (data, rest) = result
                 n_success += 1
 
@@ -236,6 +558,8 @@ def _n_or_more(parser, n):
                 else:
                     return None
 
+    if n > 0:
+        n_or_more_lambda.first = first
     return n_or_more_lambda
 
 
@@ -264,13 +588,13 @@ def _test_n_or_more():
     (data, rest) = _n_or_more(_weekday, 2)(pass_with_return_data_input)
     assert data == [
         {
-            "days": [DatetimeModWeek(0, 0, 0)]
+            "days": _days_mask([0])
         },
         {
-            "days": [DatetimeModWeek(1, 0, 0)]
+            "days": _days_mask([1])
         },
         {
-            "days": [DatetimeModWeek(2, 0, 0)]
+            "days": _days_mask([2])
         }
     ]
     assert rest == ""
@@ -288,32 +612,99 @@ def _test_n_or_more():
     assert rest == "sdfg"
 
 
+def _string(search_string):
+    def string_lambda(input):
+        if input.startswith(search_string):
+            return (
+                [
+                    {
+                        "string": search_string
+                    }
+                ],
+                input[len(search_string):]
+            )
+
+        if _tracker.get():
+            # Report the first character that differs, as matching one
+            # character at a time would
+            i = 0
+            while i < len(input) and input[i] == search_string[i]:
+                i += 1
+            return _fail(input[i:], repr(search_string[i]))
+
+        return None
+
+    string_lambda.first = frozenset(search_string[:1])
+    return string_lambda
+
+
+def _test_string():
+    search_string = "abcd"
+
+    fail_inputs = [
+        "",
+        "qwerty"
+    ]
+    
+    for fail_input in fail_inputs:
+        assert _string(search_string)(fail_input) is None
+
+    pass_without_tail_input = "abcd"
+    (data, rest) = _string(search_string)(pass_without_tail_input)
+    assert data == [
+        {
+            "string": search_string
+        }
+    ]
+    assert rest == ""
+    
+    pass_with_tail_input = "abcde"
+    (data, rest) = _string(search_string)(pass_with_tail_input)
+    assert data == [
+        {
+            "string": search_string
+        }
+    ]
+    assert rest == "e"
+
+    # Failures are reported where the input first differs
+    tracker = _FailureTracker()
+    token = _tracker.set(tracker)
+    try:
+        assert _string(search_string)("abXd") is None
+    finally:
+        _tracker.reset(token)
+    assert tracker.remaining == 2
+    assert tracker.expected == {"'c'"}
+
+
 # Combined parsers
+_day_range_grammar = _sequence([
+    _weekday,
+    _either([
+        _char("-"),
+        _char("\u2013")  # En dash
+    ]),
+    _weekday
+])
+
+
+@_starts_like(_day_range_grammar)
 def _day_range(input):
-    if result := _sequence(
-        [
-            _weekday,
-            _char("-"),
-            _weekday
-        ]
-    )(input):
+    if result := _day_range_grammar(input):
         (data, rest) = result
-        start_day = data[0]["days"][0]
-        end_day = data[1]["days"][0]
-
-        # Make range with modular arithmetic
-        one_day = DatetimeModWeek(1, 0, 0)
-        current_day = start_day
-        _days = []
+        start_day = data[0]["days"].bit_length() - 1
+        end_day = data[1]["days"].bit_length() - 1
 
-        # Add one_day to include end_day in generated range
-        while current_day != (end_day + one_day):
-            _days.append(current_day)
-            current_day += one_day
+        # Set one bit per day from start_day to end_day inclusive, then
+        # rotate any bits past Sunday round to the start of the week
+        n_days = (end_day - start_day) % 7 + 1
+        mask = ((1 << n_days) - 1) << start_day
+        mask = (mask | mask >> 7) & _ALL_DAYS
 
         data = [
             {
-                "days": _days
+                "days": mask
             }
         ]
 
@@ -330,12 +721,7 @@ def _test_day_range():
     (data, rest) = _day_range(pass_without_tail_input)
     assert data == [
         {
-            "days": [
-                DatetimeModWeek(2, 0, 0),
-                DatetimeModWeek(3, 0, 0),
-                DatetimeModWeek(4, 0, 0),
-                DatetimeModWeek(5, 0, 0),
-            ]
+            "days": _days_mask([2, 3, 4, 5])
         }
     ]
     assert rest == ""
@@ -344,13 +730,7 @@ def _test_day_range():
     (data, rest) = _day_range(pass_with_tail_input)
     assert data == [
         {
-            "days": [
-                DatetimeModWeek(0, 0, 0),
-                DatetimeModWeek(1, 0, 0),
-                DatetimeModWeek(2, 0, 0),
-                DatetimeModWeek(3, 0, 0),
-                DatetimeModWeek(4, 0, 0),
-            ]
+            "days": _days_mask([0, 1, 2, 3, 4])
         }
     ]
     assert rest == " "
@@ -359,42 +739,68 @@ def _test_day_range():
     (data, rest) = _day_range(pass_with_overflow_input)
     assert data == [
         {
-            "days": [
-                DatetimeModWeek(5, 0, 0),
-                DatetimeModWeek(6, 0, 0),
-                DatetimeModWeek(0, 0, 0),
-                DatetimeModWeek(1, 0, 0),
-            ]
+            "days": _days_mask([5, 6, 0, 1])
         }
     ]
     assert rest == ""
 
+    single_day_range_input = "Thu-Thu"
+    (data, rest) = _day_range(single_day_range_input)
+    assert data == [
+        {
+            "days": _days_mask([3])
+        }
+    ]
+    assert rest == ""
 
-def _days(rest):
-    if result := _sequence([
-        _either([
-            _day_range,
-            _weekday
+    whole_week_with_overflow_input = "Tue-Mon"
+    (data, rest) = _day_range(whole_week_with_overflow_input)
+    assert data == [
+        {
+            "days": _ALL_DAYS
+        }
+    ]
+    assert rest == ""
+
+    en_dash_input = "Wed\u2013Sat"
+    (data, rest) = _day_range(en_dash_input)
+    assert data == [
+        {
+            "days": _days_mask([2, 3, 4, 5])
+        }
+    ]
+    assert rest == ""
+
+
+_days_grammar = _sequence([
+    _either([
+        _day_range,
+        _weekday
+    ]),
+    _n_or_more(
+        _sequence([
+            _string(", "),
+            _either([
+                _day_range,
+                _weekday
+            ])
         ]),
-        _n_or_more(
-            _sequence([
-                _string(", "),
-                _either([
-                    _day_range,
-                    _weekday
-                ])
-            ]),
-            n=0
-        )
-    ])(rest):
+        n=0
+    )
+])
+
+
+@_starts_like(_days_grammar)
+def _days(rest):
+    if result := _days_grammar(rest):
         (data, rest) = result
 
         # Collate all _days in the stack
-        days_all = []
+        days_all = 0
         for item in data:
             # Discard any separators that ended up in the stack
             if "days" in item:
-                days_all += item["days"]
+                days_all |= item["days"]
 
         return (
             [
@@ -422,7 +828,7 @@ def _test_days():
     (data, rest) = _days(single_day_input)
     assert data == [
         {
-            "days_all": [DatetimeModWeek(2, 0, 0)]
+            "days_all": _days_mask([2])
         }
     ]
     assert rest == ""
@@ -431,13 +837,7 @@ def _test_days():
     (data, rest) = _days(day_range_input)
     assert data == [
         {
-            "days_all": [
-                DatetimeModWeek(0, 0, 0),
-                DatetimeModWeek(1, 0, 0),
-                DatetimeModWeek(2, 0, 0),
-                DatetimeModWeek(3, 0, 0),
-                DatetimeModWeek(4, 0, 0),
-            ]
+            "days_all": _days_mask([0, 1, 2, 3, 4])
         }
     ]
     assert rest == ""
@@ -446,12 +846,7 @@ def _test_days():
     (data, rest) = _days(days_input)
     assert data == [
         {
-            "days_all": [
-                DatetimeModWeek(0, 0, 0),
-                DatetimeModWeek(1, 0, 0),
-                DatetimeModWeek(2, 0, 0),
-                DatetimeModWeek(4, 0, 0),
-            ]
+            "days_all": _days_mask([0, 1, 2, 4])
         }
     ]
     assert rest == ""
@@ -460,13 +855,7 @@ def _test_days():
     (data, rest) = _days(days_with_rollover_input)
     assert data == [
         {
-            "days_all": [
-                DatetimeModWeek(2, 0, 0),
-                DatetimeModWeek(5, 0, 0),
-                DatetimeModWeek(6, 0, 0),
-                DatetimeModWeek(0, 0, 0),
-                DatetimeModWeek(1, 0, 0)
-            ]
+            "days_all": _days_mask([2, 5, 6, 0, 1])
         }
     ]
     assert rest == ""
@@ -475,23 +864,31 @@ def _test_days():
     (data, rest) = _days(pass_with_tail_input)
     assert data == [
         {
-            "days_all": [
-                DatetimeModWeek(0, 0, 0),
-                DatetimeModWeek(1, 0, 0),
-                DatetimeModWeek(3, 0, 0),
-                DatetimeModWeek(5, 0, 0),
-                DatetimeModWeek(6, 0, 0),
-            ]
+            "days_all": _days_mask([0, 1, 3, 5, 6])
         }
     ]
     assert rest == " 9:00"
 
+    # Whole weeks are every day, not none
+    for whole_week_input in ["Mon-Sun", "Tue-Mon"]:
+        (data, rest) = _days(whole_week_input)
+        assert data == [
+            {
+                "days_all": _ALL_DAYS
+            }
+        ]
+        assert rest == ""
+
+
+_number_grammar = _n_or_more(
+    _numeral,
+    n=1
+)
+
 
+@_starts_like(_number_grammar)
 def _number(input):
-    if result := _n_or_more(
-        _numeral,
-        n=1
-    )(input):
+    if result := _number_grammar(input):
         (data, rest) = result
         number_found = 0
 
@@ -561,7 +958,8 @@ def _number_in_range(input, n, m):
         number_found = data[0]["number_found"]
 
         if number_found < n or number_found >= m:
-            return None
+            # Reported where the out-of-range number ends
+            return _fail(rest, "number from {} to {}".format(n, m - 1))
 
         else:
             return (
@@ -615,53 +1013,7 @@ def _test_number_in_range():
     assert rest == "c"
 
 
-def _string(search_string):
-    def string_lambda(input):
-        parsers = [_char(c) for c in search_string]
-
-        if result := _sequence(parsers)(input):
-            (_, rest) = result
-            return (
-                [
-                    {
-                        "string": search_string
-                    }
-                ],
-                rest
-            )
-    return string_lambda
-
-
-def _test_string():
-    search_string = "abcd"
-
-    fail_inputs = [
-        "",
-        "qwerty"
-    ]
-    
-    for fail_input in fail_inputs:
-        assert _string(search_string)(fail_input) is None
-
-    pass_without_tail_input = "abcd"
-    (data, rest) = _string(search_string)(pass_without_tail_input)
-    assert data == [
-        {
-            "string": search_string
-        }
-    ]
-    assert rest == ""
-    
-    pass_with_tail_input = "abcde"
-    (data, rest) = _string(search_string)(pass_with_tail_input)
-    assert data == [
-        {
-            "string": search_string
-        }
-    ]
-    assert rest == "e"
-
-
+@_starts_like(_number)
 def _hour(input):
     if result := _number_in_range(
         input,
@@ -696,6 +1048,7 @@ def _test_hour():
             assert rest == tail
 
 
+@_starts_like(_number)
 def _minute(input):
     if result := _number_in_range(
         input,
@@ -732,24 +1085,28 @@ def _test_minute():
             assert rest == tail
 
 
-def _time(input):
-    if result := _sequence([
-        _either([
-            _sequence([
-                _hour,
-                _char(":"),
-                _minute
-            ]),
-            _hour
+_clock_time_grammar = _sequence([
+    _either([
+        _sequence([
+            _hour,
+            _char(":"),
+            _minute
         ]),
-        _char(" "),
-        _either([
-            _string("am"),
-            _string("pm")
-        ])
-    ])(input):
+        _hour
+    ]),
+    _char(" "),
+    _either([
+        _string("am"),
+        _string("pm")
+    ])
+])
+
+
+@_starts_like(_clock_time_grammar)
+def _clock_time(input):
+    if result := _clock_time_grammar(input):
         (data, rest) = result
-        is_pm = data.pop()["string"] == "pm"
+        is_pm = _IS_PM[data.pop()["string"]]
 
         if "minute" in data[-1]:
             found_minute = data.pop()["minute"]
@@ -781,6 +1138,42 @@ def _time(input):
         return None
 
 
+_NAMED_TIMES = {
+    "noon": DatetimeModWeek(0, 12, 0),
+    "midnight": DatetimeModWeek(0, 0, 0)
+}
+
+_named_time_grammar = _either([
+    _string("noon"),
+    _string("midnight")
+])
+
+
+@_starts_like(_named_time_grammar)
+def _named_time(input):
+    if result := _named_time_grammar(input):
+        (data, rest) = result
+
+        return (
+            [
+                {
+                    "time": _NAMED_TIMES[data[0]["string"]]
+                }
+            ],
+            rest
+        )
+    else:
+        return None
+
+
+# Named times start with letters and clock times with digits, so dispatch
+# sends each row straight to its own alternative
+_time = _either([
+    _clock_time,
+    _named_time
+])
+
+
 def _test_time():
     # Tests that should fail
     fail_inputs = [
@@ -857,13 +1250,29 @@ def _test_time():
     ]
     assert rest == ""
 
+    for (named_input, hour) in [("noon", 12), ("midnight", 0)]:
+        (data, rest) = _time(named_input + " tail")
+        assert data == [
+            {
+                "time": DatetimeModWeek(0, hour, 0)
+            }
+        ]
+        assert rest == " tail"
 
-def _time_range(input):
-    if result := _sequence([
-        _time,
+
+_time_range_grammar = _sequence([
+    _time,
+    _either([
         _string(" - "),
-        _time
-    ])(input):
+        _string(" \u2013 ")
+    ]),
+    _time
+])
+
+
+@_starts_like(_time_range_grammar)
+def _time_range(input):
+    if result := _time_range_grammar(input):
         (data, rest) = result
 
         close_time = data.pop()["time"]
@@ -916,36 +1325,153 @@ def _test_time_range():
     ]
     assert rest == " Monday"
 
+    en_dash_input = "noon \u2013 midnight"
+    (data, rest) = _time_range(en_dash_input)
+    assert data == [
+        {
+            "open_time": DatetimeModWeek(0, 12, 0),
+            "close_time": DatetimeModWeek(0, 0, 0)
+        }
+    ]
+    assert rest == ""
+
+
+_all_day_grammar = _string("24 hours")
 
+
+@_starts_like(_all_day_grammar)
+def _all_day(input):
+    if result := _all_day_grammar(input):
+        (_, rest) = result
+
+        # Closing a whole day after opening, rather than at the same time,
+        # which would never be open
+        return (
+            [
+                {
+                    "open_time": _WEEKDAY_DATETIMES[0],
+                    "close_time": _ONE_DAY
+                }
+            ],
+            rest
+        )
+    else:
+        return None
+
+
+# "24 hours" is only tried once a time range has failed on a "2"
+_hours = _either([
+    _time_range,
+    _all_day
+])
+
+
+_datetime_grammar = _sequence([
+    _days,
+    _char(" "),
+    _hours
+])
+
+
+@_starts_like(_datetime_grammar)
 def _datetime(input):
-    if result := _sequence([
-        _days,
-        _char(" "),
-        _time_range
-    ])(input):
+    if result := _datetime_grammar(input):
         (data, rest) = result
 
         times_found = data.pop()
         days_all_found = data.pop()["days_all"]
 
-        hours = []
+        # Per-day intervals are left to expand_schedule
+        return (
+            [
+                {
+                    "days": days_all_found,
+                    "open_time": times_found["open_time"],
+                    "close_time": times_found["close_time"]
+                }
+            ],
+            rest
+        )
+    else:
+        return None
 
-        if times_found["close_time"] < times_found["open_time"]:
-            day_rollover = DatetimeModWeek(1, 0, 0)
-        else:
-            day_rollover = DatetimeModWeek(0, 0, 0)
 
-        for day_found in days_all_found:
-            hours.append({
-                "open_datetime": day_found + times_found["open_time"],
-                "close_datetime": day_found + day_rollover + times_found["close_time"],
-            })
+# "24 hours" on its own is every day
+@_starts_like(_all_day)
+def _every_day(input):
+    if result := _all_day(input):
+        (data, rest) = result
+        data[0]["days"] = _ALL_DAYS
 
-        return (hours, rest)
+        return (data, rest)
     else:
         return None
 
 
+_closed_grammar = _sequence([
+    _string("Closed "),
+    _days
+])
+
+
+@_starts_like(_closed_grammar)
+def _closed(input):
+    if result := _closed_grammar(input):
+        (data, rest) = result
+
+        return (
+            [
+                {
+                    "closed": data[-1]["days_all"]
+                }
+            ],
+            rest
+        )
+    else:
+        return None
+
+
+def remove_closed_days(items):
+    # "Closed" items take their days away from every other item, wherever
+    # in the string they appear
+    closed = 0
+    for item in items:
+        closed |= item.get("closed", 0)
+
+    if not closed:
+        return items
+
+    schedule = []
+    for item in items:
+        if "closed" in item:
+            continue
+
+        if days := item["days"] & ~closed:
+            schedule.append(dict(item, days=days))
+
+    return schedule
+
+
+def expand_schedule(schedule):
+    hours = []
+
+    for item in schedule:
+        open_time = item["open_time"]
+        close_time = item["close_time"]
+
+        if close_time < open_time:
+            close_time = close_time + _ONE_DAY
+
+        for day_num in _MASK_DAYS[item["days"]]:
+            day = _WEEKDAY_DATETIMES[day_num]
+            hours.append({
+                "open_datetime": day + open_time,
+                "close_datetime": day + close_time
+            })
+
+    return hours
+
+
 def _test_datetime():
     # Tests that should fail
     fail_inputs = [
@@ -959,9 +1485,20 @@ def _test_datetime():
         assert _datetime(fail_input) is None
 
     # Tests that should pass
+    compact_input = "Mon-Wed, Fri 10:15 am - 5 pm"
+    (schedule, rest) = _datetime(compact_input)
+    assert schedule == [
+        {
+            "days": _days_mask([0, 1, 2, 4]),
+            "open_time": DatetimeModWeek(0, 10, 15),
+            "close_time": DatetimeModWeek(0, 17, 0)
+        }
+    ]
+    assert rest == ""
+
     single_day_input = "Mon 9:45 am - 6 pm"
-    (data, rest) = _datetime(single_day_input)
-    assert data == [
+    (schedule, rest) = _datetime(single_day_input)
+    assert expand_schedule(schedule) == [
         {
             "open_datetime": DatetimeModWeek(0, 9, 45),
             "close_datetime": DatetimeModWeek(0, 18, 0)
@@ -970,8 +1507,8 @@ def _test_datetime():
     assert rest == ""
 
     multiple_day_input = "Mon-Wed, Fri 10:15 am - 5 pm"
-    (data, rest) = _datetime(multiple_day_input)
-    assert data == [
+    (schedule, rest) = _datetime(multiple_day_input)
+    assert expand_schedule(schedule) == [
         {
             "open_datetime": DatetimeModWeek(0, 10, 15),
             "close_datetime": DatetimeModWeek(0, 17, 0)
@@ -992,8 +1529,8 @@ def _test_datetime():
     assert rest == ""
 
     day_overflow_input = "Mon 1 pm - 2:30 am"
-    (data, rest) = _datetime(day_overflow_input)
-    assert data == [
+    (schedule, rest) = _datetime(day_overflow_input)
+    assert expand_schedule(schedule) == [
         {
             "open_datetime": DatetimeModWeek(0, 13, 0),
             "close_datetime": DatetimeModWeek(1, 2, 30)
@@ -1002,8 +1539,8 @@ def _test_datetime():
     assert rest == ""
 
     week_overflow_input = "Sun 11 am - 4:15 am"
-    (data, rest) = _datetime(week_overflow_input)
-    assert data == [
+    (schedule, rest) = _datetime(week_overflow_input)
+    assert expand_schedule(schedule) == [
         {
             "open_datetime": DatetimeModWeek(6, 11, 0),
             "close_datetime": DatetimeModWeek(0, 4, 15)
@@ -1011,28 +1548,105 @@ def _test_datetime():
     ]
     assert rest == ""
 
+    all_day_input = "Sat-Sun 24 hours"
+    (schedule, rest) = _datetime(all_day_input)
+    assert expand_schedule(schedule) == [
+        {
+            "open_datetime": DatetimeModWeek(5, 0, 0),
+            "close_datetime": DatetimeModWeek(6, 0, 0)
+        },
+        {
+            "open_datetime": DatetimeModWeek(6, 0, 0),
+            "close_datetime": DatetimeModWeek(0, 0, 0)
+        }
+    ]
+    assert rest == ""
+    for hours in expand_schedule(schedule):
+        assert datetime_in_range(
+            hours["open_datetime"],
+            hours["close_datetime"],
+            hours["open_datetime"] + DatetimeModWeek(0, 23, 59)
+        )
+
+
+def _test_expand_schedule():
+    assert expand_schedule([]) == []
 
-def parse(input):
-    if result := _sequence([
-        _datetime,
-        _n_or_more(
-            _sequence([
+    # Days come out in week order, once each
+    (schedule, _) = _datetime("Sun, Wed, Mon-Tue, Wed 9 am - 5 pm")
+    assert [
+        hours["open_datetime"] for hours in expand_schedule(schedule)
+    ] == [
+        DatetimeModWeek(0, 9, 0),
+        DatetimeModWeek(1, 9, 0),
+        DatetimeModWeek(2, 9, 0),
+        DatetimeModWeek(6, 9, 0)
+    ]
+
+
+def parse(input, budget=None):
+    result = parse_schedule(input, budget)
+
+    if result is None or result is BUDGET_EXCEEDED:
+        return result
+
+    (schedule, rest) = result
+    return (expand_schedule(schedule), rest)
+
+
+def parse_schedule(input, budget=None):
+    if len(input) > _VIEW_LENGTH:
+        input = _Rest(input)
+
+    if budget is None:
+        return _parse(input)
+
+    budget.start()
+    token = _budget.set(budget)
+
+    try:
+        return _parse(input)
+    except _BudgetExhausted:
+        return BUDGET_EXCEEDED
+    finally:
+        _budget.reset(token)
+
+
+# Segments start with a weekday, "C" or "2", so the alternatives never
+# compete for a row
+_segment = _either([
+    _datetime,
+    _closed,
+    _every_day
+])
+
+_parse_grammar = _sequence([
+    _segment,
+    _n_or_more(
+        _sequence([
+            _either([
                 _string("  / "),
-                _datetime
+                _string(" / ")
             ]),
-            n=0
-        )
-    ])(input):
+            _segment
+        ]),
+        n=0
+    )
+])
+
+
+def _parse(input):
+    if result := _parse_grammar(input):
         (data, rest) = result
 
-        restaurant_hours_datetimes = []
+        schedule = []
         for item in data:
             if "string" in item:
                 continue
 
-            restaurant_hours_datetimes.append(item)
+            schedule.append(item)
 
-        return (restaurant_hours_datetimes, rest)
+        return (remove_closed_days(schedule), str(rest))
     else:
         return None
 
@@ -1104,9 +1718,145 @@ def _test_parse():
     ]
     assert rest == ""
 
+    # Closed days come off every other segment, before or after them
+    (data, rest) = parse("Closed Tue  / Mon-Wed 9 am - 5 pm / Closed Wed")
+    assert data == [
+        {
+            "open_datetime": DatetimeModWeek(0, 9, 0),
+            "close_datetime": DatetimeModWeek(0, 17, 0)
+        }
+    ]
+    assert rest == ""
+
+    (data, rest) = parse("Closed Mon")
+    assert data == []
+    assert rest == ""
+
+    (data, rest) = parse("24 hours")
+    assert len(data) == 7
+    assert rest == ""
+
+    # A whole-week range opens every day; it used to open none
+    (data, rest) = parse("Mon-Sun 11 am - 10 pm")
+    assert data == [
+        {
+            "open_datetime": DatetimeModWeek(day_num, 11, 0),
+            "close_datetime": DatetimeModWeek(day_num, 22, 0)
+        }
+        for day_num in range(7)
+    ]
+    assert rest == ""
+
+    # Long inputs parse in full, and their rest comes back as a str
+    day_list = "Mon" + ", Mon"*20000 + " 9 am - 5 pm"
+    assert parse(day_list) == parse("Mon 9 am - 5 pm")
+    (data, rest) = parse(day_list + " Banana")
+    assert rest == " Banana" and type(rest) is str
+    assert parse(day_list + ",") == (parse("Mon 9 am - 5 pm")[0], ",")
+    assert parse(", Mon"*20000) is None
+
+def _test_parse_budget():
+    # Step budgets
+    input = "Mon-Wed, Fri 8:00 am - 4:30 pm  / Sat 10 am - 2:30 pm"
+    budget = ParseBudget(max_steps=10**6)
+    assert parse(input, budget) == parse(input)
+
+    steps_needed = budget.steps
+    assert steps_needed > 0
+    assert parse(input, ParseBudget(max_steps=steps_needed)) == parse(input)
+    assert parse(input, ParseBudget(max_steps=steps_needed - 1)) \
+        is BUDGET_EXCEEDED
+
+    # Failures within budget are still plain failures
+    assert parse("asdf", ParseBudget(max_steps=1000)) is None
+
+    # A budget can be reused; each parse starts counting afresh
+    budget = ParseBudget(max_steps=steps_needed)
+    assert parse(input, budget) is not BUDGET_EXCEEDED
+    assert parse(input, budget) is not BUDGET_EXCEEDED
+
+    # Time budgets
+    long_input = "Mon" + ", Mon"*100000 + " 9 am - 5 pm"
+    assert parse(long_input, ParseBudget(max_seconds=0.001)) \
+        is BUDGET_EXCEEDED
+
+    # The sentinel cannot pass for a parse
+    assert not BUDGET_EXCEEDED
+    try:
+        (data, rest) = BUDGET_EXCEEDED
+        assert False, "BUDGET_EXCEEDED should not unpack"
+    except TypeError:
+        pass
+
+    # The budget is switched off again afterwards
+    assert _budget.get() is None
+
+
+def parse_error(input):
+    tracker = _FailureTracker()
+    token = _tracker.set(tracker)
+
+    try:
+        result = parse(input)
+    finally:
+        _tracker.reset(token)
+
+    if result is not None and result[1] == "":
+        return None
+
+    # Report the furthest point any parser reached, in UTF-8 bytes
+    stop = len(input) - tracker.remaining
+    return {
+        "offset": len(input[:stop].encode("utf-8")),
+        "expected": tuple(sorted(tracker.expected))
+    }
+
+
+def _test_parse_error():
+    assert parse_error("Mon 9 am - 4 pm") is None
+
+    error = parse_error("")
+    assert error == {
+        "offset": 0,
+        "expected": ("'2'", "'C'", "weekday")
+    }
+
+    error = parse_error("Mon 9 am - 4 pm Banana")
+    assert error == {
+        "offset": 16,
+        "expected": ("' '", "'/'")
+    }
+
+    error = parse_error("Mon-Fri 13 am - 4 pm")
+    assert error["offset"] == 10
+    assert "number from 1 to 12" in error["expected"]
+
+    error = parse_error("Mon 9:45 am - 4 zm")
+    assert error == {
+        "offset": 16,
+        "expected": ("'a'", "'p'")
+    }
+
+    # Offsets count bytes, not characters
+    error = parse_error("Mon 9 am \u2014 4 pm")
+    assert error["offset"] == 9
+
+    # Long inputs report offsets the same way
+    day_list = "Mon" + ", Mon"*1000
+    error = parse_error(day_list + " 9 am - 5 zm")
+    assert error == {
+        "offset": len(day_list) + 10,
+        "expected": ("'a'", "'p'")
+    }
+
+    # Tracking is switched off again afterwards
+    assert _tracker.get() is None
+
+
 if __name__ == "__main__":
     # ==== Tests ====
     # Primitive parsers
+    _test_rest()
     _test_char()
     _test_numeral()
     _test_weekday()
@@ -1114,7 +1864,9 @@ if __name__ == "__main__":
     # Combinators
     _test_sequence()
     _test_either()
+    _test_either_dispatch()
     _test_n_or_more()
+    _test_first_sets()
 
     # Combined parsers
     _test_day_range()
@@ -1127,4 +1879,7 @@ if __name__ == "__main__":
     _test_time()
     _test_time_range()
     _test_datetime()
+    _test_expand_schedule()
     _test_parse()
+    _test_parse_budget()
+    _test_parse_error()
@@ -0,0 +1,192 @@
+import os
+from metrics import REGISTRY
+from modular_datetime import pack_hours, unpack_hours
+
+
+# Bump whenever parse() would give different intervals for the same string,
+# so older sidecars are ignored rather than trusted
+CACHE_VERSION = 1
+
+SIDECAR_SUFFIX = ".parsed.json"
+
+_CACHE_HITS = REGISTRY.counter(
+    "restaurants_parse_cache_hits_total",
+    "Rows whose intervals came from the parse cache"
+)
+_CACHE_MISSES = REGISTRY.counter(
+    "restaurants_parse_cache_misses_total",
+    "Rows parsed because the parse cache had no entry for their hours"
+)
+
+
+def hours_key(hours_string):
+    import hashlib
+
+    return hashlib.blake2b(
+        hours_string.encode("utf-8"),
+        digest_size=16
+    ).hexdigest()
+
+
+def sidecar_filename(csv_filename):
+    return csv_filename + SIDECAR_SUFFIX
+
+
+class ParseCache:
+    # Parsed intervals keyed by a hash of the hours string, so identical
+    # hours share an entry and edited rows miss. Intervals are stored as
+    # minutes of the week, which is all the resolution parse() produces.
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.entries = {}
+        self.changed = False
+        # Keys looked up or stored this run. Only these are saved, so
+        # entries for hours no longer in the CSV drop out.
+        self.used = set()
+
+        if filename is not None:
+            self._load()
+
+    def _load(self):
+        import json
+
+        try:
+            with open(self.filename) as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        if saved.get("version") == CACHE_VERSION:
+            self.entries = saved["entries"]
+
+    def get(self, hours_string):
+        key = hours_key(hours_string)
+        packed = self.entries.get(key)
+
+        if packed is None:
+            _CACHE_MISSES.inc()
+            return None
+
+        _CACHE_HITS.inc()
+        self.used.add(key)
+        return unpack_hours(packed)
+
+    def put(self, hours_string, hours_datetimes):
+        key = hours_key(hours_string)
+        self.entries[key] = list(pack_hours(hours_datetimes))
+        self.used.add(key)
+        self.changed = True
+
+    def save(self):
+        import json
+        import tempfile
+
+        # Nothing new and nothing to prune
+        if not self.changed and len(self.used) == len(self.entries):
+            return
+
+        self.entries = {key: self.entries[key] for key in self.used}
+
+        # Written aside then renamed, so a concurrent run never reads half
+        # a sidecar
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        (fd, temp_filename) = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {
+                        "version": CACHE_VERSION,
+                        "entries": self.entries
+                    },
+                    f,
+                    separators=(",", ":")
+                )
+            os.replace(temp_filename, self.filename)
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+
+        self.changed = False
+
+
+def _test_parse_cache():
+    import csv
+    import tempfile
+    from find_open_restaurants import load_restaurants
+
+    with open("rest_hours.csv", newline="") as f:
+        rows = list(csv.reader(f))
+
+    directory = tempfile.mkdtemp()
+    csv_filename = os.path.join(directory, "hours.csv")
+    try:
+        with open(csv_filename, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+        expected = load_restaurants(csv_filename)
+
+        # First run parses everything and fills the sidecar
+        cache = ParseCache(sidecar_filename(csv_filename))
+        assert load_restaurants(csv_filename, cache=cache) == expected
+        assert cache.changed
+        cache.save()
+        assert os.path.exists(sidecar_filename(csv_filename))
+
+        # Later runs trust it, and only parse rows whose hours changed
+        rows[0][1] = "Mon 9 am - 5 pm"
+        with open(csv_filename, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+        misses_before = _CACHE_MISSES.value
+        cache = ParseCache(sidecar_filename(csv_filename))
+        restaurants = load_restaurants(csv_filename, cache=cache)
+        assert restaurants == load_restaurants(csv_filename)
+        assert _CACHE_MISSES.value - misses_before == 1
+
+        # Saving drops the entry for the hours that were edited away
+        old_key = hours_key(expected[0]["hours_string"])
+        assert old_key in cache.entries
+        cache.save()
+        saved = ParseCache(sidecar_filename(csv_filename))
+        assert old_key not in saved.entries
+        assert set(saved.entries) == {
+            hours_key(restaurant["hours_string"])
+            for restaurant in restaurants
+        }
+
+        # A run that only hits still prunes, and one with nothing to prune
+        # leaves the sidecar alone
+        saved.entries["stale"] = saved.entries[hours_key(rows[0][1])]
+        load_restaurants(csv_filename, cache=saved)
+        assert not saved.changed
+        saved.save()
+        assert "stale" not in ParseCache(
+            sidecar_filename(csv_filename)
+        ).entries
+        modified = os.stat(sidecar_filename(csv_filename)).st_mtime_ns
+        saved.save()
+        assert os.stat(sidecar_filename(csv_filename)).st_mtime_ns == \
+            modified
+
+        # Sidecars from another parser version are ignored
+        with open(sidecar_filename(csv_filename)) as f:
+            text = f.read()
+        with open(sidecar_filename(csv_filename), "w") as f:
+            f.write(text.replace(
+                '"version":{}'.format(CACHE_VERSION),
+                '"version":0'
+            ))
+        assert ParseCache(sidecar_filename(csv_filename)).entries == {}
+
+        # As are unreadable ones
+        with open(sidecar_filename(csv_filename), "w") as f:
+            f.write("{")
+        assert ParseCache(sidecar_filename(csv_filename)).entries == {}
+    finally:
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    _test_parse_cache()
@@ -1,14 +1,502 @@
-from string import printable
+import csv
+import functools
+import heapq
+import os
 import random
-from open_hours_parser import parse_restaurant_hours
+import re
+import sys
+import time
+from multiprocessing import Pool
+import generated_parser
+import open_hours_parser
+from open_hours_parser import parse
 
-rounds = int(1e5)
-string_length = int(1e3)
 
-for n in range(rounds):
-    print("{:2.0f}".format(n/rounds*100) + "% Complete")
-    parse_restaurant_hours(
-        [random.choice(printable) for c in range(string_length)]
+# Vocabulary for grammar-aware mutations
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+BAD_WEEKDAYS = ["Moo", "mon", "Sunday", "Thurs", "M", ""]
+NUMBERS = ["0", "1", "9", "10", "11", "12", "13", "00", "05", "30", "45",
+           "59", "60", "99", "123", "0012"]
+MERIDIEMS = ["am", "pm", "AM", "a.m.", "p", "noon", "midnight"]
+SEPARATORS = [", ", ",", "-", " - ", "  / ", " / ", ":", " ", "  ", "",
+              "\u2013", " \u2013 ", "Closed ", "24 hours"]
+
+MAX_INPUT_LENGTH = 4000
+MAX_CORPUS_SIZE = 2000
+N_SLOWEST = 10
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+| +|.", re.DOTALL)
+_PARSER_FILENAME = open_hours_parser.__file__
+
+
+def load_seeds(csv_filename="rest_hours.csv"):
+    with open(csv_filename, newline="") as f:
+        return [entry[1] for entry in csv.reader(f) if len(entry) > 1]
+
+
+def _tokenize(input):
+    return _TOKEN_PATTERN.findall(input)
+
+
+# Mutations
+# Each takes a token list and returns a new token list
+def _replace_token(tokens, rng, corpus):
+    i = rng.randrange(len(tokens))
+    token = tokens[i]
+
+    if token in WEEKDAYS:
+        choices = WEEKDAYS + BAD_WEEKDAYS
+    elif token.isdigit():
+        choices = NUMBERS
+    elif token in ("am", "pm"):
+        choices = MERIDIEMS
+    else:
+        choices = SEPARATORS
+
+    return tokens[:i] + [rng.choice(choices)] + tokens[i+1:]
+
+
+def _delete_token(tokens, rng, corpus):
+    i = rng.randrange(len(tokens))
+    return tokens[:i] + tokens[i+1:]
+
+
+def _duplicate_token(tokens, rng, corpus):
+    i = rng.randrange(len(tokens))
+    return tokens[:i+1] + tokens[i:]
+
+
+def _swap_tokens(tokens, rng, corpus):
+    if len(tokens) < 2:
+        return tokens
+
+    i = rng.randrange(len(tokens) - 1)
+    return tokens[:i] + [tokens[i+1], tokens[i]] + tokens[i+2:]
+
+
+def _insert_token(tokens, rng, corpus):
+    i = rng.randrange(len(tokens) + 1)
+    token = rng.choice([
+        rng.choice(WEEKDAYS),
+        rng.choice(NUMBERS),
+        rng.choice(MERIDIEMS),
+        rng.choice(SEPARATORS),
+        rng.choice("\t\n-/:,")
+    ])
+    return tokens[:i] + [token] + tokens[i:]
+
+
+def _splice(tokens, rng, corpus):
+    other = _tokenize(rng.choice(corpus))
+    return tokens[:rng.randrange(len(tokens) + 1)] \
+        + other[rng.randrange(len(other) + 1):]
+
+
+def _repeat_list(tokens, rng, corpus):
+    # Long day lists and segment lists probe for performance cliffs
+    i = rng.randrange(len(tokens) + 1)
+    if rng.random() < 0.5:
+        segment = [", ", rng.choice(WEEKDAYS)]
+    else:
+        segment = ["  / "] + _tokenize(rng.choice(corpus))
+
+    return tokens[:i] + segment*rng.randint(2, 200) + tokens[i:]
+
+
+MUTATIONS = [
+    _replace_token,
+    _replace_token,
+    _delete_token,
+    _duplicate_token,
+    _swap_tokens,
+    _insert_token,
+    _splice,
+    _repeat_list
+]
+
+
+def mutate(input, rng, corpus):
+    tokens = _tokenize(input) or [""]
+
+    for _ in range(rng.randint(1, 3)):
+        tokens = rng.choice(MUTATIONS)(tokens, rng, corpus) or [""]
+
+    return "".join(tokens)[:MAX_INPUT_LENGTH]
+
+
+# Coverage
+# Counted in _either branches: which alternative each _either in the
+# grammar has chosen. Lines would not tell alternatives apart, since every
+# _either runs the same combinator code whichever one it picks.
+_EITHER_CODE = open_hours_parser._either([]).__code__
+
+
+def _closure(function):
+    return dict(zip(
+        function.__code__.co_freevars,
+        (cell.cell_contents for cell in function.__closure__ or ())
+    ))
+
+
+def _module_functions(function):
+    # Parser functions from the module that function calls or closes over
+    functions = []
+
+    for value in _closure(function).values():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        functions += values
+
+    codes = [function.__code__]
+    while codes:
+        code = codes.pop()
+        functions += [
+            vars(open_hours_parser).get(name)
+            for name in code.co_names
+        ]
+        codes += [c for c in code.co_consts if hasattr(c, "co_code")]
+
+    return [
+        value for value in functions
+        if getattr(value, "__code__", None) is not None
+        and value.__code__.co_filename == _PARSER_FILENAME
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _module_names():
+    return {
+        id(value): name
+        for (name, value) in vars(open_hours_parser).items()
+        if callable(value)
+    }
+
+
+def _describe(parser):
+    names = _module_names()
+    if id(parser) in names:
+        return names[id(parser)]
+
+    closure = _closure(parser)
+    if "search_string" in closure:
+        return repr(closure["search_string"])
+    if "c" in closure:
+        return repr(closure["c"])
+    if "parsers" in closure:
+        joiner = " | " if parser.__code__ is _EITHER_CODE else " "
+        return "(" + joiner.join(map(_describe, closure["parsers"])) + ")"
+    if "parser" in closure:
+        return _describe(closure["parser"]) + "*"
+
+    return parser.__name__
+
+
+@functools.lru_cache(maxsize=None)
+def _eithers():
+    # Every _either parse() can reach, as {id of its alternatives: label}.
+    # Named ones are labelled by name, the rest by the named parser they
+    # sit in and their order there. Walking from parse() leaves out
+    # parse_error() and anything only used while building the grammar.
+    names = _module_names()
+    labels = {}
+    seen = set()
+    counts = {}
+    stack = [(open_hours_parser.parse, "parse")]
+
+    while stack:
+        (function, parent) = stack.pop()
+        if id(function) in seen:
+            continue
+        seen.add(id(function))
+
+        parent = names.get(id(function), parent)
+
+        if function.__code__ is _EITHER_CODE:
+            alternatives = _closure(function)["parsers"]
+            if id(function) in names:
+                label = parent
+            else:
+                counts[parent] = counts.get(parent, 0) + 1
+                label = "{} #{}".format(parent, counts[parent])
+            labels[id(alternatives)] = (label, alternatives)
+
+        stack += [
+            (child, parent)
+            for child in reversed(_module_functions(function))
+        ]
+
+    return labels
+
+
+def parser_branches():
+    # {(either, alternative index): what the alternative parses}
+    return {
+        (label, i): _describe(alternative)
+        for (label, alternatives) in _eithers().values()
+        for (i, alternative) in enumerate(alternatives)
+    }
+
+
+def _covered_branches(input):
+    eithers = _eithers()
+    branches = set()
+
+    def either_trace(frame, event, arg):
+        # A truthy return is the alternative that matched
+        if event == "return" and arg:
+            local = frame.f_locals
+            (label, alternatives) = eithers[id(local["parsers"])]
+            branches.add((label, alternatives.index(local["parser"])))
+        return either_trace
+
+    def global_trace(frame, event, arg):
+        if frame.f_code is _EITHER_CODE:
+            return either_trace
+        return None
+
+    sys.settrace(global_trace)
+    try:
+        parse(input)
+    finally:
+        sys.settrace(None)
+
+    return branches
+
+
+def _check(input, result):
+    # The generated parser must agree with the combinators on everything
+    assert generated_parser.parse(input) == result, \
+        "generated parser disagrees"
+
+    if result is not None:
+        (data, rest) = result
+        assert isinstance(data, list), "data is not a list"
+        assert input.endswith(rest), "rest is not a suffix of the input"
+
+        if rest == "":
+            return
+
+    # Failed inputs also exercise the error reporting path
+    error = open_hours_parser.parse_error(input)
+    assert 0 <= error["offset"] <= len(input.encode("utf-8")), \
+        "error offset out of bounds"
+    assert error["expected"], "no expected tokens reported"
+
+
+def _fuzz_worker(job):
+    (seed, corpus, known_branches, iterations) = job
+    rng = random.Random(seed)
+    known_branches = set(known_branches)
+
+    n_parses = 0
+    parse_seconds = 0.0
+    new_inputs = []
+    slowest = []
+    crashes = []
+
+    for _ in range(iterations):
+        input = mutate(rng.choice(corpus), rng, corpus)
+
+        start = time.perf_counter()
+        try:
+            result = parse(input)
+            elapsed = time.perf_counter() - start
+            _check(input, result)
+        except Exception as e:
+            crashes.append((input, repr(e)))
+            continue
+
+        n_parses += 1
+        parse_seconds += elapsed
+
+        if len(slowest) < N_SLOWEST:
+            heapq.heappush(slowest, (elapsed, input))
+        elif elapsed > slowest[0][0]:
+            heapq.heapreplace(slowest, (elapsed, input))
+
+        # Keep inputs that take branches nobody has taken before
+        branches = _covered_branches(input)
+        if not branches <= known_branches:
+            known_branches |= branches
+            new_inputs.append(input)
+
+    return {
+        "parses": n_parses,
+        "parse_seconds": parse_seconds,
+        "branches": known_branches,
+        "new_inputs": new_inputs,
+        "slowest": slowest,
+        "crashes": crashes
+    }
+
+
+def fuzz(rounds=10, iterations=2000, workers=None, seed=0):
+    workers = workers or os.cpu_count()
+    seeds = load_seeds()
+    discovered = []
+    corpus = seeds
+    known_branches = set()
+    for input in seeds:
+        known_branches |= _covered_branches(input)
+
+    n_parses = 0
+    parse_seconds = 0.0
+    slowest = []
+    crashes = []
+    wall_start = time.perf_counter()
+
+    with Pool(workers) as pool:
+        for round in range(rounds):
+            jobs = [
+                (seed*1000003 + round*workers + worker, corpus,
+                 known_branches, iterations)
+                for worker in range(workers)
+            ]
+
+            for result in pool.map(_fuzz_worker, jobs):
+                n_parses += result["parses"]
+                parse_seconds += result["parse_seconds"]
+                known_branches |= result["branches"]
+                discovered += result["new_inputs"]
+                crashes += result["crashes"]
+                slowest = heapq.nlargest(
+                    N_SLOWEST,
+                    slowest + result["slowest"]
+                )
+
+            # Seeds always stay in; the newest discoveries fill the rest
+            discovered = discovered[-MAX_CORPUS_SIZE:]
+            corpus = seeds + discovered
+
+            print("Round {}/{}: {} parses, {} branches taken, {} "
+                  "crashes".format(
+                      round + 1,
+                      rounds,
+                      n_parses,
+                      len(known_branches),
+                      len(crashes)
+                  ))
+
+    return {
+        "parses": n_parses,
+        "parse_seconds": parse_seconds,
+        "wall_seconds": time.perf_counter() - wall_start,
+        "workers": workers,
+        "branches": known_branches,
+        "slowest": slowest,
+        "crashes": crashes
+    }
+
+
+def print_report(report):
+    all_branches = parser_branches()
+    taken = report["branches"] & set(all_branches)
+
+    print()
+    print("Throughput: {:.0f} parses/sec per core, {:.0f} parses/sec "
+          "overall on {} workers".format(
+              report["parses"] / report["parse_seconds"],
+              report["parses"] / report["wall_seconds"],
+              report["workers"]
+          ))
+    print("Coverage: {}/{} either branches".format(
+        len(taken),
+        len(all_branches)
+    ))
+
+    for branch in sorted(set(all_branches) - taken):
+        print("  {} never chose {}".format(branch[0], all_branches[branch]))
+
+    print("Slowest inputs:")
+    for (elapsed, input) in report["slowest"]:
+        print("  {:8.1f} us  {:5d} chars  {!r}".format(
+            elapsed*1e6,
+            len(input),
+            input if len(input) <= 60 else input[:57] + "..."
+        ))
+
+    if report["crashes"]:
+        print("Crashes:")
+        for (input, error) in report["crashes"]:
+            print("  {!r}: {}".format(input, error))
+    else:
+        print("No errors encountered")
+
+
+def _test_mutate():
+    rng = random.Random(0)
+    corpus = load_seeds()
+
+    for _ in range(1000):
+        input = mutate(rng.choice(corpus), rng, corpus)
+        assert isinstance(input, str)
+        assert len(input) <= MAX_INPUT_LENGTH
+
+
+def _test_covered_branches():
+    all_branches = parser_branches()
+    branches = _covered_branches("Mon 9 am - 5 pm")
+    assert branches <= set(all_branches)
+
+    # Alternatives of one _either are told apart
+    assert _covered_branches("Mon 9 am - 5 am") != branches
+    assert _covered_branches("Mon 9 am \u2013 5 pm") != branches
+    assert ("_segment", 0) in branches
+    assert all_branches[("_named_time_grammar", 1)] == "'midnight'"
+
+    # The seeds, fuzzed or not, can only take branches parse() can reach
+    taken = set()
+    for input in load_seeds() + [
+        "Mon\u2013Fri noon \u2013 midnight / Closed Wed",
+        "24 hours  / Closed Sun, Mon",
+        "Mon-Sun 24 hours  / Closed Tue",
+        "Sat-Sun 11:30 am - 9 pm"
+    ]:
+        taken |= _covered_branches(input)
+    assert taken <= set(all_branches)
+    assert taken == set(all_branches), sorted(set(all_branches) - taken)
+
+    # Tracing is switched off afterwards
+    assert sys.gettrace() is None
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Fuzz parse() with grammar-aware mutations of "
+                    "rest_hours.csv."
+    )
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=2000,
+        help="inputs per worker per round"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="worker processes (default: all cores)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--self-test",
+        action="store_true",
+        help="run this module's tests and exit"
+    )
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        _test_mutate()
+        _test_covered_branches()
+        return 0
+
+    report = fuzz(args.rounds, args.iterations, args.workers, args.seed)
+    print_report(report)
+
+    return 1 if report["crashes"] else 0
+
 
-print("No errors encountered")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,484 @@
+import os
+import sys
+
+
+# Grammar
+# The hours format as data. Expressions are tuples:
+#   ("literal", text)                 match text exactly
+#   ("table", name, width)            look up the next width characters in
+#                                     the named table; the value is the entry
+#   ("number", low, high)             one or more ASCII digits whose value is
+#                                     from low to high - 1
+#   ("rule", name)                    another rule, inlined
+#   ("sequence", items, action)       items are (capture name or None, expr);
+#                                     action is a Python expression over the
+#                                     captures
+#   ("either", exprs)                 first alternative that matches
+#   ("list", item, separator, fold)   item (separator item)*, greedy, where
+#                                     separator is an expression; fold is
+#                                     "append" to collect values into a list
+#                                     or "or" to OR them together
+#
+# Like the combinators in open_hours_parser.py, alternatives and lists never
+# backtrack once they have matched.
+GRAMMAR = {
+    "schedule": ("sequence", [
+        ("segments", ("list", ("rule", "segment"), ("either", [
+            ("literal", "  / "),
+            ("literal", " / ")
+        ]), "append"))
+    ], "remove_closed_days(segments)"),
+    "segment": ("either", [
+        ("rule", "datetime"),
+        ("rule", "closed"),
+        ("rule", "every_day")
+    ]),
+    "datetime": ("either", [
+        ("sequence", [
+            ("days", ("rule", "days")),
+            (None, ("literal", " ")),
+            ("open_time", ("rule", "time")),
+            (None, ("either", [
+                ("literal", " - "),
+                ("literal", " \u2013 ")
+            ])),
+            ("close_time", ("rule", "time"))
+        ], '{"days": days, "open_time": open_time, "close_time": close_time}'),
+        ("sequence", [
+            ("days", ("rule", "days")),
+            (None, ("literal", " 24 hours"))
+        ], '{"days": days, "open_time": _TIMES[0], "close_time": _ONE_DAY}')
+    ]),
+    "closed": ("sequence", [
+        (None, ("literal", "Closed ")),
+        ("days", ("rule", "days"))
+    ], '{"closed": days}'),
+    "every_day": ("sequence", [
+        (None, ("literal", "24 hours"))
+    ], '{"days": 0b1111111, "open_time": _TIMES[0], "close_time": _ONE_DAY}'),
+    "days": ("list", ("rule", "day_item"), ("literal", ", "), "or"),
+    "day_item": ("either", [
+        ("rule", "day_range"),
+        ("rule", "weekday")
+    ]),
+    "day_range": ("sequence", [
+        ("start", ("table", "_WEEKDAY_NUMBERS", 3)),
+        (None, ("either", [
+            ("literal", "-"),
+            ("literal", "\u2013")
+        ])),
+        ("end", ("table", "_WEEKDAY_NUMBERS", 3))
+    ], "_DAY_RANGE_MASKS[start][end]"),
+    "weekday": ("sequence", [
+        ("day_num", ("table", "_WEEKDAY_NUMBERS", 3))
+    ], "1 << day_num"),
+    "time": ("either", [
+        ("sequence", [
+            ("hour", ("number", 1, 13)),
+            (None, ("literal", ":")),
+            ("minute", ("number", 0, 60)),
+            (None, ("literal", " ")),
+            ("pm", ("table", "_MERIDIEM_HOURS", 2))
+        ], "_TIMES[(hour % 12 + pm)*60 + minute]"),
+        ("sequence", [
+            ("hour", ("number", 1, 13)),
+            (None, ("literal", " ")),
+            ("pm", ("table", "_MERIDIEM_HOURS", 2))
+        ], "_TIMES[(hour % 12 + pm)*60]"),
+        ("sequence", [
+            (None, ("literal", "noon"))
+        ], "_TIMES[12*60]"),
+        ("sequence", [
+            (None, ("literal", "midnight"))
+        ], "_TIMES[0]")
+    ])
+}
+
+START = "schedule"
+
+# Emitted ahead of the parser: the tables and helpers actions refer to
+PRELUDE = '''\
+from modular_datetime import DatetimeModWeek
+from open_hours_parser import expand_schedule, remove_closed_days
+
+
+_WEEKDAY_NUMBERS = {
+    "Mon": 0,
+    "Tue": 1,
+    "Wed": 2,
+    "Thu": 3,
+    "Fri": 4,
+    "Sat": 5,
+    "Sun": 6
+}
+_MERIDIEM_HOURS = {
+    "am": 0,
+    "pm": 12
+}
+
+# Start day to end day inclusive, wrapping past Sunday
+_DAY_RANGE_MASKS = [
+    [
+        sum(1 << (start + i) % 7 for i in range((end - start) % 7 + 1))
+        for end in range(7)
+    ]
+    for start in range(7)
+]
+
+# Every minute of the day. Mod values are never changed in place, so
+# results can share them.
+_TIMES = [
+    DatetimeModWeek(0, hour, minute)
+    for hour in range(24)
+    for minute in range(60)
+]
+
+_ONE_DAY = DatetimeModWeek(1, 0, 0)
+
+_DIGITS = "0123456789"
+'''
+
+GENERATED_FILENAME = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "generated_parser.py"
+)
+
+
+class _Emitter:
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.lines = []
+        self.n_names = 0
+        self.inlining = []
+
+    def name(self, prefix):
+        self.n_names += 1
+        return "{}_{}".format(prefix, self.n_names)
+
+    def line(self, depth, text):
+        self.lines.append("    "*depth + text)
+
+    # Each emit_* writes statements that leave ok True, pos past the match
+    # and the value in target on success, or ok False on failure. Callers
+    # restore pos themselves when they need to backtrack.
+    def emit(self, expr, target, depth):
+        getattr(self, "emit_" + expr[0])(expr, target, depth)
+
+    def emit_literal(self, expr, target, depth):
+        text = expr[1]
+
+        if len(text) == 1:
+            self.line(depth, "if input[pos:pos + 1] == {!r}:".format(text))
+        else:
+            self.line(depth, "if input.startswith({!r}, pos):".format(text))
+        self.line(depth + 1, "pos += {}".format(len(text)))
+        self.line(depth + 1, "ok = True")
+        self.line(depth, "else:")
+        self.line(depth + 1, "ok = False")
+
+    def emit_table(self, expr, target, depth):
+        (_, table, width) = expr
+
+        self.line(depth, "{} = {}.get(input[pos:pos + {}])".format(
+            target,
+            table,
+            width
+        ))
+        self.line(depth, "ok = {} is not None".format(target))
+        self.line(depth, "if ok:")
+        self.line(depth + 1, "pos += {}".format(width))
+
+    def emit_number(self, expr, target, depth):
+        (_, low, high) = expr
+        end = self.name("end")
+
+        self.line(depth, "{} = pos".format(end))
+        self.line(depth, "while {} < n and input[{}] in _DIGITS:".format(
+            end,
+            end
+        ))
+        self.line(depth + 1, "{} += 1".format(end))
+        self.line(depth, "ok = {} > pos".format(end))
+        self.line(depth, "if ok:")
+        # Leading zeros are allowed, as in "0012", so only the digits after
+        # them count. A run longer than high can have is out of range, and
+        # must not reach int(), which refuses over 4300 digits.
+        first = self.name("first")
+        self.line(depth + 1, "{} = pos".format(first))
+        self.line(
+            depth + 1,
+            "while {} < {} - 1 and input[{}] == \"0\":".format(
+                first,
+                end,
+                first
+            )
+        )
+        self.line(depth + 2, "{} += 1".format(first))
+        self.line(depth + 1, "ok = {} - {} <= {}".format(
+            end,
+            first,
+            len(str(high - 1))
+        ))
+        self.line(depth + 1, "if ok:")
+        self.line(depth + 2, "{} = int(input[{}:{}])".format(
+            target,
+            first,
+            end
+        ))
+        self.line(depth + 2, "ok = {} <= {} < {}".format(low, target, high))
+        self.line(depth + 1, "pos = {}".format(end))
+
+    def emit_rule(self, expr, target, depth):
+        name = expr[1]
+        assert name not in self.inlining, \
+            "Rule {} is recursive and cannot be inlined".format(name)
+
+        self.inlining.append(name)
+        self.line(depth, "# {}".format(name))
+        self.emit(self.grammar[name], target, depth)
+        self.inlining.pop()
+
+    def emit_sequence(self, expr, target, depth):
+        (_, items, action) = expr
+        captures = {}
+
+        for (i, (capture, item)) in enumerate(items):
+            if capture is None:
+                item_target = self.name("skip")
+            else:
+                item_target = captures[capture] = self.name(capture)
+
+            self.emit(item, item_target, depth)
+
+            if i < len(items) - 1:
+                self.line(depth, "if ok:")
+                depth += 1
+
+        self.line(depth, "if ok:")
+        # Captures get unique names so inlined rules cannot clash; the
+        # action is evaluated with its own names bound to them
+        self.line(depth + 1, "{} = {}".format(
+            target,
+            _bind(action, captures)
+        ))
+
+    def emit_either(self, expr, target, depth):
+        start = self.name("start")
+        self.line(depth, "{} = pos".format(start))
+
+        for (i, alternative) in enumerate(expr[1]):
+            if i > 0:
+                self.line(depth, "if not ok:")
+                depth += 1
+                self.line(depth, "pos = {}".format(start))
+
+            self.emit(alternative, target, depth)
+
+    def emit_list(self, expr, target, depth):
+        (_, item, separator, fold) = expr
+        value = self.name("item")
+        save = self.name("save")
+
+        self.emit(item, value, depth)
+        self.line(depth, "if ok:")
+        depth += 1
+        if fold == "append":
+            self.line(depth, "{} = [{}]".format(target, value))
+        else:
+            self.line(depth, "{} = {}".format(target, value))
+
+        self.line(depth, "while True:")
+        self.line(depth + 1, "{} = pos".format(save))
+        self.emit(separator, None, depth + 1)
+        self.line(depth + 1, "if ok:")
+        self.emit(item, value, depth + 2)
+        self.line(depth + 1, "if not ok:")
+        self.line(depth + 2, "pos = {}".format(save))
+        self.line(depth + 2, "break")
+        if fold == "append":
+            self.line(depth + 1, "{}.append({})".format(target, value))
+        else:
+            self.line(depth + 1, "{} |= {}".format(target, value))
+
+        self.line(depth, "ok = True")
+
+
+def _bind(action, captures):
+    import io
+    import tokenize
+
+    # Rename capture names only, leaving strings and spacing alone
+    pieces = []
+    end = 0
+    for token in tokenize.generate_tokens(io.StringIO(action).readline):
+        if token.type == tokenize.NAME and token.string in captures:
+            (_, start_col) = token.start
+            pieces += [action[end:start_col], captures[token.string]]
+            end = token.end[1]
+    pieces.append(action[end:])
+
+    return "".join(pieces)
+
+
+def generate(grammar=GRAMMAR, start=START):
+    emitter = _Emitter(grammar)
+
+    emitter.line(1, "n = len(input)")
+    emitter.line(1, "pos = 0")
+    emitter.emit(("rule", start), "result", 1)
+    emitter.line(1, "if ok:")
+    emitter.line(2, "return (result, input[pos:])")
+    emitter.line(1, "return None")
+
+    return "\n".join([
+        "# Generated by parser_generator.py from its GRAMMAR. Do not edit;",
+        "# change the grammar and run python parser_generator.py --write",
+        "# instead.",
+        PRELUDE,
+        "",
+        "def parse_schedule(input):",
+        *emitter.lines,
+        "",
+        "",
+        "def parse(input):",
+        "    if result := parse_schedule(input):",
+        "        (schedule, rest) = result",
+        "        return (expand_schedule(schedule), rest)",
+        "",
+        "    return None",
+        ""
+    ])
+
+
+def write_generated(filename=GENERATED_FILENAME):
+    with open(filename, "w") as f:
+        f.write(generate())
+
+
+def _validation_inputs(n_fuzzed=5000):
+    import random
+    from parser_fuzzer import load_seeds, mutate
+
+    seeds = load_seeds()
+    rng = random.Random(0)
+
+    return seeds + [
+        mutate(rng.choice(seeds), rng, seeds)
+        for _ in range(n_fuzzed)
+    ]
+
+
+def _test_generated_is_current():
+    with open(GENERATED_FILENAME) as f:
+        assert f.read() == generate(), \
+            "generated_parser.py is stale; run parser_generator.py --write"
+
+
+def _test_generated_parse():
+    import generated_parser
+    import open_hours_parser
+
+    # The reference parser's own tests, pointed at the generated parser
+    reference_parse = open_hours_parser.parse
+    open_hours_parser.parse = generated_parser.parse
+    try:
+        open_hours_parser._test_parse()
+    finally:
+        open_hours_parser.parse = reference_parse
+
+    for input in _validation_inputs() + [
+        "",
+        "Mon",
+        "Mon 12 am - 12 pm",
+        "Sun-Mon 11:59 pm - 0012 am",
+        "Fri-Thu 9 am - 5 pm",
+        "Mon 9:60 am - 5 pm",
+        "Mon 9 am - 5 pm  / ",
+        "Mon, Tue, , Wed 9 am - 5 pm",
+        "Mon\u2013Fri noon \u2013 midnight / Closed Wed",
+        "Closed Mon  / 24 hours",
+        "Sat-Sun 24 hours  / Closed Sun, Mon",
+        "Mon 24 hour",
+        "Closed ",
+        "Mon 2 am - 24 hours",
+        "Mon " + "0"*3000 + "9 am - 5 pm",
+        "Mon " + "9"*4000 + " am - 5 pm",
+        "Mon " + "9"*5000 + " am - 5 pm"
+    ]:
+        assert generated_parser.parse(input) == reference_parse(input), \
+            repr(input)
+        assert generated_parser.parse_schedule(input) == \
+            open_hours_parser.parse_schedule(input), repr(input)
+
+
+def _test_long_digit_runs():
+    import sys
+    import generated_parser
+    import open_hours_parser
+
+    # Python 3.11+ caps int() at 4300 digits; with a lower cap, digit runs
+    # the input length limit allows must still fail rather than raise
+    if not hasattr(sys, "set_int_max_str_digits"):
+        return
+
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(640)
+    try:
+        for input in [
+            "Mon " + "9"*1000 + " am - 5 pm",
+            "Mon 9:" + "5"*1000 + " am - 5 pm",
+            "Mon " + "0"*1000 + "9 am - 5 pm"
+        ]:
+            assert generated_parser.parse(input) == \
+                open_hours_parser.parse(input), repr(input[:20])
+    finally:
+        sys.set_int_max_str_digits(limit)
+
+
+def _test_recursive_grammar():
+    grammar = {
+        "a": ("sequence", [("x", ("rule", "a"))], "x")
+    }
+
+    try:
+        generate(grammar, "a")
+        assert False, "Recursive grammars should be rejected"
+    except AssertionError as e:
+        assert "recursive" in e.args[0]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Test generated_parser.py against the hours grammar, "
+        "or write it."
+    )
+    # Tests are the default, so a bare run never overwrites the checked-in
+    # parser
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--self-test",
+        action="store_true",
+        help="run this module's tests and exit (the default)"
+    )
+    mode.add_argument(
+        "--write",
+        action="store_true",
+        help="regenerate generated_parser.py from GRAMMAR"
+    )
+    args = parser.parse_args(argv)
+
+    if args.write:
+        write_generated()
+        return 0
+
+    _test_generated_is_current()
+    _test_generated_parse()
+    _test_long_digit_runs()
+    _test_recursive_grammar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
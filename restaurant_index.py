@@ -0,0 +1,392 @@
+import functools
+import itertools
+import os
+import tempfile
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from time import perf_counter
+from find_open_restaurants import (
+    load_restaurants,
+    open_restaurants,
+    parse_restaurant
+)
+from metrics import REGISTRY
+from modular_datetime import DatetimeModWeek, datetime_in_range
+
+
+# Distinct minutes of the week to keep query results for
+QUERY_CACHE_SIZE = 4096
+
+_INDEX_BUILD_SECONDS = REGISTRY.histogram(
+    "restaurants_index_build_seconds",
+    "Time to build a RestaurantIndex from parsed restaurants"
+)
+_QUERY_SECONDS = REGISTRY.histogram(
+    "restaurants_query_seconds",
+    "Time to answer one open-restaurants query, cache hits included"
+)
+_QUERY_CACHE_HITS = REGISTRY.counter(
+    "restaurants_query_cache_hits_total",
+    "Open-restaurants lookups answered from the query cache"
+)
+_QUERY_CACHE_MISSES = REGISTRY.counter(
+    "restaurants_query_cache_misses_total",
+    "Open-restaurants lookups that had to evaluate the minute"
+)
+
+# Set when a cache lookup had to evaluate its minute. A context variable
+# keeps concurrent threads and tasks apart.
+_evaluated = ContextVar("evaluated", default=False)
+
+
+def minute_of_week(search_datetime):
+    return (
+        search_datetime.weekday()*24*60
+        + search_datetime.hour*60
+        + search_datetime.minute
+    )
+
+
+class RestaurantIndex:
+    __slots__ = ("_entries", "_columns", "_open_at_minute")
+
+    def __init__(self, restaurants, cache_size=QUERY_CACHE_SIZE):
+        start = perf_counter()
+
+        # Kept in alphabetical order (stable, so restaurants sharing a name
+        # stay in CSV order) so queries come out sorted without sorting.
+        # A restaurant's id is its position in this order.
+        restaurants = sorted(
+            restaurants,
+            key=lambda rest: rest["name"].casefold()
+        )
+
+        # Tuples all the way down so a published index can never change
+        # under a concurrent reader
+        entries = tuple(
+            (
+                rest["name"],
+                tuple(
+                    (hour_range["open_datetime"], hour_range["close_datetime"])
+                    for hour_range in rest["hours_datetimes"]
+                )
+            )
+            for rest in restaurants
+        )
+        columns = tuple(
+            tuple(rest.get("columns", {}).items())
+            for rest in restaurants
+        )
+        object.__setattr__(self, "_entries", entries)
+        object.__setattr__(self, "_columns", columns)
+
+        # Results repeat every week, so they are cached by minute of the
+        # week. The cache belongs to this index and is dropped with it when
+        # a reload publishes a replacement.
+        object.__setattr__(
+            self,
+            "_open_at_minute",
+            functools.lru_cache(maxsize=cache_size)(self._evaluate_minute)
+        )
+
+        _INDEX_BUILD_SECONDS.observe(perf_counter() - start)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RestaurantIndex is immutable")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def names(self):
+        return [name for (name, _) in self._entries]
+
+    def name(self, restaurant_id):
+        return self._entries[restaurant_id][0]
+
+    def columns(self, restaurant_id):
+        return dict(self._columns[restaurant_id])
+
+    def cache_info(self):
+        return self._open_at_minute.cache_info()
+
+    def open_restaurants(self, search_datetime, offset=0, limit=None):
+        start = perf_counter()
+        minute = minute_of_week(search_datetime)
+
+        if limit is None:
+            open_ids = self._cached_open_ids(minute)[offset:]
+        else:
+            # A page stops scanning as soon as it is full, which beats
+            # caching whole results for every page
+            open_ids = itertools.islice(
+                self._iter_open_ids(minute),
+                offset,
+                offset + limit
+            )
+
+        open_restaurants = [self._entries[i][0] for i in open_ids]
+
+        _QUERY_SECONDS.observe(perf_counter() - start)
+        return open_restaurants
+
+    def open_ids(self, search_datetime):
+        # Ascending ids, so alphabetical order
+        return self._cached_open_ids(minute_of_week(search_datetime))
+
+    def is_open(self, restaurant_id, search_datetime):
+        search_datetime_modular = _modular(minute_of_week(search_datetime))
+
+        return any(
+            datetime_in_range(
+                open_datetime,
+                close_datetime,
+                search_datetime_modular
+            )
+            for (open_datetime, close_datetime)
+            in self._entries[restaurant_id][1]
+        )
+
+    def _cached_open_ids(self, minute):
+        _evaluated.set(False)
+        open_ids = self._open_at_minute(minute)
+
+        if _evaluated.get():
+            _QUERY_CACHE_MISSES.inc()
+        else:
+            _QUERY_CACHE_HITS.inc()
+
+        return open_ids
+
+    def _evaluate_minute(self, minute):
+        _evaluated.set(True)
+        return tuple(self._iter_open_ids(minute))
+
+    def _iter_open_ids(self, minute):
+        search_datetime_modular = _modular(minute)
+
+        for (restaurant_id, (_, hour_ranges)) in enumerate(self._entries):
+            for (open_datetime, close_datetime) in hour_ranges:
+                if datetime_in_range(
+                    open_datetime,
+                    close_datetime,
+                    search_datetime_modular
+                ):
+                    # Once per restaurant, however many ranges match
+                    yield restaurant_id
+                    break
+
+
+def _modular(minute):
+    (day, minute_of_day) = divmod(minute, 24*60)
+
+    return DatetimeModWeek(day, minute_of_day // 60, minute_of_day % 60)
+
+
+def load_index(source, extra_columns=()):
+    # source is a CSV filename or any row source
+    return RestaurantIndex(load_restaurants(source, extra_columns))
+
+
+class SharedIndex:
+    def __init__(self, index=None):
+        if index is None:
+            index = RestaurantIndex([])
+
+        self._index = index
+        # Only writers take this lock, to serialise concurrent reloads.
+        # Readers never touch it.
+        self._publish_lock = threading.Lock()
+
+    def current(self):
+        return self._index
+
+    def publish(self, index):
+        with self._publish_lock:
+            # A single reference assignment is atomic, so readers see
+            # either the old index or the new one, never a mix
+            self._index = index
+
+    def reload(self, source):
+        # Build fully before publishing
+        self.publish(load_index(source))
+
+    def cache_info(self):
+        return self._index.cache_info()
+
+    def find_open_restaurants(self, search_datetime, offset=0, limit=None):
+        # Read the reference once; the whole query runs against one snapshot
+        index = self._index
+        return index.open_restaurants(search_datetime, offset, limit)
+
+
+def _sorted_unique(names):
+    return sorted(set(names), key=str.casefold)
+
+
+def _test_restaurant_index():
+    csv_filename = "rest_hours.csv"
+    restaurants = load_restaurants(csv_filename)
+    index = RestaurantIndex(restaurants)
+
+    assert len(index) == len(restaurants)
+    assert index.names() == _sorted_unique(index.names())
+
+    for search_datetime in [
+        datetime(2020, 11, 14, 13, 45),
+        datetime(2020, 11, 15, 23, 59),
+        datetime(2020, 11, 16, 1, 0)
+    ]:
+        assert index.open_restaurants(search_datetime) == \
+            _sorted_unique(open_restaurants(restaurants, search_datetime))
+
+    try:
+        index._entries = ()
+        assert False, "RestaurantIndex should be immutable"
+    except AttributeError:
+        pass
+
+
+def _test_query_cache():
+    restaurants = load_restaurants("rest_hours.csv")
+    index = RestaurantIndex(restaurants, cache_size=2)
+
+    saturday = datetime(2020, 11, 14, 13, 45)
+    expected = _sorted_unique(open_restaurants(restaurants, saturday))
+
+    assert index.open_restaurants(saturday) == expected
+    assert index.cache_info().misses == 1
+
+    # Seconds, and the week itself, do not matter
+    for search_datetime in [
+        datetime(2020, 11, 14, 13, 45, 59),
+        datetime(2020, 11, 21, 13, 45),
+        datetime(2021, 1, 2, 13, 45)
+    ]:
+        assert index.open_restaurants(search_datetime) == expected
+
+    assert index.cache_info().hits == 3
+    assert index.cache_info().misses == 1
+
+    # Results handed out are copies
+    index.open_restaurants(saturday).clear()
+    assert index.open_restaurants(saturday) == expected
+
+    # The cache is bounded
+    for minute in range(10):
+        index.open_restaurants(datetime(2020, 11, 16, 12, minute))
+    assert index.cache_info().currsize == 2
+
+    # Caching can be turned off
+    uncached = RestaurantIndex(restaurants, cache_size=0)
+    assert uncached.open_restaurants(saturday) == expected
+    assert uncached.open_restaurants(saturday) == expected
+    assert uncached.cache_info().hits == 0
+
+
+def _test_ordering_and_pagination():
+    global datetime_in_range
+
+    restaurants = [
+        parse_restaurant("bistro", "Mon-Sun 9 am - 5 pm"),
+        parse_restaurant("Cafe", "Mon 9 am - 12 pm  / Mon 11 am - 5 pm"),
+        parse_restaurant("Aardvark", "Mon 9 am - 5 pm"),
+        parse_restaurant("Diner", "Tue 9 am - 5 pm"),
+        parse_restaurant("Cafe", "Mon 10 am - 1 pm")
+    ]
+    index = RestaurantIndex(restaurants)
+    monday = datetime(2020, 11, 16, 11, 30)
+
+    # Alphabetical regardless of case; one entry per restaurant even when
+    # several of its ranges match; same-named restaurants each appear
+    all_open = ["Aardvark", "bistro", "Cafe", "Cafe"]
+    assert index.open_restaurants(monday) == all_open
+
+    pages = [
+        index.open_restaurants(monday, offset, 2)
+        for offset in range(0, 6, 2)
+    ]
+    assert pages == [all_open[0:2], all_open[2:4], []]
+    assert index.open_restaurants(monday, offset=3) == all_open[3:]
+
+    # A page stops scanning once full
+    checked = []
+    original = datetime_in_range
+
+    def counting_datetime_in_range(start, end, current):
+        checked.append(start)
+        return original(start, end, current)
+
+    datetime_in_range = counting_datetime_in_range
+    try:
+        assert index.open_restaurants(monday, limit=1) == ["Aardvark"]
+    finally:
+        datetime_in_range = original
+    assert len(checked) == 1
+
+
+def _test_shared_index():
+    csv_filename = "rest_hours.csv"
+    search_datetime = datetime(2020, 11, 14, 13, 45)
+
+    with open(csv_filename, newline="") as f:
+        lines = f.readlines()
+
+    (fd, half_filename) = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            f.writelines(lines[:len(lines) // 2])
+
+        full_index = load_index(csv_filename)
+        half_index = load_index(half_filename)
+
+        shared = SharedIndex()
+        assert shared.find_open_restaurants(search_datetime) == []
+
+        shared.reload(csv_filename)
+        assert shared.current().names() == full_index.names()
+
+        # Readers must only ever see one complete catalogue or the other
+        valid_results = [
+            full_index.open_restaurants(search_datetime),
+            half_index.open_restaurants(search_datetime)
+        ]
+        failures = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                result = shared.find_open_restaurants(search_datetime)
+                if result not in valid_results:
+                    failures.append(result)
+
+        def writer():
+            for n in range(20):
+                shared.reload(half_filename if n % 2 else csv_filename)
+            stop.set()
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        threads.append(threading.Thread(target=writer))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert failures == []
+
+        # Reloading starts a fresh cache
+        shared.reload(csv_filename)
+        assert shared.cache_info().currsize == 0
+        shared.find_open_restaurants(search_datetime)
+        shared.find_open_restaurants(search_datetime)
+        assert shared.cache_info().hits == 1
+    finally:
+        os.remove(half_filename)
+
+
+if __name__ == "__main__":
+    _test_restaurant_index()
+    _test_query_cache()
+    _test_ordering_and_pagination()
+    _test_shared_index()
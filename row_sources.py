@@ -0,0 +1,151 @@
+import os
+
+
+# Row sources
+# A row source is any iterable of rows, each a sequence starting with the
+# restaurant's name and hours string; any later values are extra columns.
+# The loaders in find_open_restaurants.py take one, or a CSV filename.
+SQLITE_BATCH_SIZE = 1000
+DEFAULT_SQLITE_QUERY = "SELECT name, hours FROM restaurants"
+
+
+def csv_rows(csv_filename):
+    # Deferred so importing this module (or running --help) stays cheap
+    import csv
+
+    with open(csv_filename, newline="") as f:
+        yield from csv.reader(f)
+
+
+def sqlite_rows(
+    database,
+    query=DEFAULT_SQLITE_QUERY,
+    parameters=(),
+    batch_size=SQLITE_BATCH_SIZE
+):
+    # database is a filename or an open sqlite3 connection. Rows are
+    # fetched a batch at a time, so the catalogue streams from the
+    # database without being held in memory.
+    import pathlib
+    import sqlite3
+
+    if isinstance(database, sqlite3.Connection):
+        connection = database
+        owned = False
+    else:
+        # Read-only, so loading can never change the catalogue. as_uri()
+        # quotes "#" and "?", which would otherwise end the path early and
+        # drop mode=ro.
+        connection = sqlite3.connect(
+            pathlib.Path(database).absolute().as_uri() + "?mode=ro",
+            uri=True
+        )
+        owned = True
+
+    try:
+        cursor = connection.execute(query, parameters)
+        try:
+            while batch := cursor.fetchmany(batch_size):
+                yield from batch
+        finally:
+            cursor.close()
+    finally:
+        if owned:
+            connection.close()
+
+
+def rows(source):
+    if isinstance(source, (str, os.PathLike)):
+        return csv_rows(source)
+
+    return source
+
+
+def _test_csv_rows():
+    rows_read = list(rows("rest_hours.csv"))
+
+    assert rows_read == list(csv_rows("rest_hours.csv"))
+    assert all(len(row) == 2 for row in rows_read)
+
+
+def _test_sqlite_rows():
+    import sqlite3
+    import tempfile
+
+    csv_rows_read = list(csv_rows("rest_hours.csv"))
+
+    (fd, database) = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(database)
+        connection.execute(
+            "CREATE TABLE restaurants (name TEXT, hours TEXT, city TEXT)"
+        )
+        connection.executemany(
+            "INSERT INTO restaurants VALUES (?, ?, ?)",
+            [(name, hours, "Vancouver") for (name, hours) in csv_rows_read]
+        )
+        connection.commit()
+
+        # Batches smaller than the table still return every row, in order
+        assert list(sqlite_rows(database, batch_size=7)) == \
+            [tuple(row) for row in csv_rows_read]
+
+        # Queries choose the columns and rows
+        assert list(sqlite_rows(
+            connection,
+            "SELECT name, hours, city FROM restaurants WHERE name = ?",
+            (csv_rows_read[0][0],)
+        )) == [tuple(csv_rows_read[0]) + ("Vancouver",)]
+
+        # A connection passed in is left open
+        connection.execute("SELECT 1")
+        connection.close()
+
+        # Filenames open read-only
+        try:
+            list(sqlite_rows(database, "DELETE FROM restaurants"))
+            assert False, "SQLite rows should be read-only"
+        except sqlite3.OperationalError:
+            pass
+    finally:
+        os.remove(database)
+
+    # Filenames with URI characters in them are still read-only, and
+    # nothing is created beside them
+    directory = tempfile.mkdtemp()
+    database = os.path.join(directory, "cat#1?.db")
+    try:
+        connection = sqlite3.connect(database)
+        connection.execute("CREATE TABLE restaurants (name TEXT, hours TEXT)")
+        connection.executemany(
+            "INSERT INTO restaurants VALUES (?, ?)",
+            csv_rows_read
+        )
+        connection.commit()
+        connection.close()
+
+        assert list(sqlite_rows(database)) == \
+            [tuple(row) for row in csv_rows_read]
+        try:
+            list(sqlite_rows(database, "CREATE TABLE x (y)"))
+            assert False, "SQLite rows should be read-only"
+        except sqlite3.OperationalError:
+            pass
+        assert os.listdir(directory) == ["cat#1?.db"]
+    finally:
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        os.rmdir(directory)
+
+
+def _test_iterable_rows():
+    source = [("Cafe", "Mon 9 am - 5 pm")]
+
+    assert rows(source) is source
+
+
+if __name__ == "__main__":
+    _test_csv_rows()
+    _test_sqlite_rows()
+    _test_iterable_rows()
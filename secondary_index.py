@@ -0,0 +1,292 @@
+from time import perf_counter
+from find_open_restaurants import load_restaurants
+from metrics import REGISTRY
+from restaurant_index import RestaurantIndex
+
+
+# Below one candidate per this many restaurants, checking each candidate's
+# hours beats computing (or fetching) everything open at that minute
+PROBE_FRACTION = 8
+
+_FILTERED_QUERY_SECONDS = REGISTRY.histogram(
+    "restaurants_filtered_query_seconds",
+    "Time to answer one open-restaurants query with filters"
+)
+
+
+class HashIndex:
+    def __init__(self, values):
+        # values[i] is the column's value for restaurant id i
+        self._postings = {}
+        for (restaurant_id, value) in enumerate(values):
+            self._postings.setdefault(value, []).append(restaurant_id)
+
+        self._postings = {
+            value: frozenset(ids)
+            for (value, ids) in self._postings.items()
+        }
+
+    def lookup(self, value):
+        return self._postings.get(value, frozenset())
+
+
+class PrefixTrie:
+    def __init__(self, names):
+        # Each node is [children, ids under this prefix]
+        self._root = [{}, []]
+
+        for (restaurant_id, name) in enumerate(names):
+            node = self._root
+            node[1].append(restaurant_id)
+            for char in name.casefold():
+                node = node[0].setdefault(char, [{}, []])
+                node[1].append(restaurant_id)
+
+        self._freeze(self._root)
+
+    def _freeze(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node[1] = frozenset(node[1])
+            stack += node[0].values()
+
+    def lookup(self, prefix):
+        node = self._root
+        for char in prefix.casefold():
+            node = node[0].get(char)
+            if node is None:
+                return frozenset()
+
+        return node[1]
+
+
+class FilteredIndex:
+    def __init__(self, restaurants, indexed_columns=None):
+        self.index = RestaurantIndex(restaurants)
+
+        columns = [self.index.columns(i) for i in range(len(self.index))]
+        if indexed_columns is None:
+            indexed_columns = sorted({
+                column
+                for restaurant_columns in columns
+                for column in restaurant_columns
+            })
+
+        self._columns = columns
+        self._name_trie = PrefixTrie(self.index.names())
+        self._hash_indexes = {
+            column: HashIndex([
+                restaurant_columns.get(column)
+                for restaurant_columns in columns
+            ])
+            for column in indexed_columns
+        }
+
+    def __len__(self):
+        return len(self.index)
+
+    def plan(self, name_prefix=None, **where):
+        # Returns (postings, residual, strategy). Postings are the id sets
+        # from indexes, smallest first; residual holds the predicates no
+        # index covers.
+        postings = []
+        residual = {}
+
+        if name_prefix:
+            postings.append(self._name_trie.lookup(name_prefix))
+
+        for (column, value) in where.items():
+            if column in self._hash_indexes:
+                postings.append(self._hash_indexes[column].lookup(value))
+            else:
+                residual[column] = value
+
+        postings.sort(key=len)
+
+        if postings and len(postings[0])*PROBE_FRACTION < len(self.index):
+            strategy = "probe"
+        else:
+            strategy = "scan"
+
+        return (postings, residual, strategy)
+
+    def open_ids(self, search_datetime, name_prefix=None, **where):
+        (postings, residual, strategy) = self.plan(name_prefix, **where)
+
+        if postings:
+            # Smallest set first, so each step only walks what survived
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates = [i for i in candidates if i in posting]
+            candidates = frozenset(candidates)
+
+        if not postings:
+            open_ids = self.index.open_ids(search_datetime)
+        elif strategy == "probe":
+            open_ids = [
+                i for i in sorted(candidates)
+                if self.index.is_open(i, search_datetime)
+            ]
+        else:
+            # Many candidates: the open set is cached per minute, and walking
+            # it keeps ids in alphabetical order
+            open_ids = [
+                i for i in self.index.open_ids(search_datetime)
+                if i in candidates
+            ]
+
+        if residual:
+            open_ids = [
+                i for i in open_ids
+                if all(
+                    self._columns[i].get(column) == value
+                    for (column, value) in residual.items()
+                )
+            ]
+
+        return open_ids
+
+    def open_restaurants(self, search_datetime, name_prefix=None, offset=0,
+                         limit=None, **where):
+        start = perf_counter()
+
+        open_ids = self.open_ids(search_datetime, name_prefix, **where)
+        if limit is None:
+            open_ids = open_ids[offset:]
+        else:
+            open_ids = open_ids[offset:offset + limit]
+
+        open_restaurants = [self.index.name(i) for i in open_ids]
+
+        _FILTERED_QUERY_SECONDS.observe(perf_counter() - start)
+        return open_restaurants
+
+
+def load_filtered_index(csv_filename, extra_columns=(), indexed_columns=None):
+    return FilteredIndex(
+        load_restaurants(csv_filename, extra_columns),
+        indexed_columns
+    )
+
+
+def _test_prefix_trie():
+    trie = PrefixTrie(["Cafe", "cafeteria", "Diner", "Caffe"])
+
+    assert trie.lookup("caf") == {0, 1, 3}
+    assert trie.lookup("CAFE") == {0, 1}
+    assert trie.lookup("") == {0, 1, 2, 3}
+    assert trie.lookup("Bistro") == frozenset()
+
+
+def _test_hash_index():
+    index = HashIndex(["thai", "pizza", "thai", None])
+
+    assert index.lookup("thai") == {0, 2}
+    assert index.lookup(None) == {3}
+    assert index.lookup("sushi") == frozenset()
+
+
+def _brute_force(restaurants, search_datetime, name_prefix, where):
+    from find_open_restaurants import open_restaurants
+
+    matching = [
+        rest for rest in restaurants
+        if rest["name"].casefold().startswith((name_prefix or "").casefold())
+        and all(
+            rest["columns"].get(column) == value
+            for (column, value) in where.items()
+        )
+    ]
+
+    return sorted(
+        set(open_restaurants(matching, search_datetime)),
+        key=str.casefold
+    )
+
+
+def _test_filtered_index():
+    import csv
+    import os
+    import random
+    import tempfile
+    from datetime import datetime
+
+    rng = random.Random(0)
+    cuisines = ["thai", "pizza", "diner", "sushi"]
+    cities = ["Vancouver", "Victoria", "Kelowna"]
+
+    with open("rest_hours.csv", newline="") as f:
+        rows = [
+            entry + [rng.choice(cuisines), rng.choice(cities)]
+            for entry in csv.reader(f)
+        ]
+
+    (fd, csv_filename) = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+        restaurants = load_restaurants(csv_filename, ("cuisine", "city"))
+        # City is left unindexed, so it is checked as a residual predicate
+        index = load_filtered_index(
+            csv_filename,
+            ("cuisine", "city"),
+            indexed_columns=("cuisine",)
+        )
+    finally:
+        os.remove(csv_filename)
+
+    assert restaurants[0]["columns"] == {
+        "cuisine": rows[0][2],
+        "city": rows[0][3]
+    }
+
+    queries = [
+        (None, {}),
+        ("T", {}),
+        ("the", {"cuisine": "thai"}),
+        (None, {"cuisine": "pizza", "city": "Victoria"}),
+        ("S", {"city": "Kelowna"}),
+        ("Nowhere", {"cuisine": "thai"}),
+        (None, {"cuisine": "french"})
+    ]
+    for day in range(16, 23):
+        for hour in [0, 9, 13, 21]:
+            search_datetime = datetime(2020, 11, day, hour, 30)
+            for (name_prefix, where) in queries:
+                assert index.open_restaurants(
+                    search_datetime,
+                    name_prefix,
+                    **where
+                ) == _brute_force(
+                    restaurants,
+                    search_datetime,
+                    name_prefix,
+                    where
+                )
+
+    # Selective filters probe their few candidates; broad ones walk the
+    # cached open set
+    assert index.plan("The")[2] == "probe"
+    assert index.plan(cuisine="thai")[2] == "scan"
+    (postings, residual, _) = index.plan("T", cuisine="thai", city="Victoria")
+    assert len(postings[0]) <= len(postings[1])
+    assert residual == {"city": "Victoria"}
+
+    search_datetime = datetime(2020, 11, 14, 13, 45)
+    all_thai = index.open_restaurants(search_datetime, cuisine="thai")
+    assert index.open_restaurants(
+        search_datetime,
+        offset=1,
+        limit=2,
+        cuisine="thai"
+    ) == all_thai[1:3]
+
+
+if __name__ == "__main__":
+    _test_prefix_trie()
+    _test_hash_index()
+    _test_filtered_index()
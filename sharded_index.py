@@ -0,0 +1,335 @@
+import heapq
+import itertools
+import os
+import threading
+import zlib
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Client, Listener
+from time import perf_counter
+from metrics import REGISTRY
+from restaurant_index import load_index
+from row_sources import rows
+
+
+_SHARDED_QUERY_SECONDS = REGISTRY.histogram(
+    "restaurants_sharded_query_seconds",
+    "Time to fan one open-restaurants query out to the shards and merge"
+)
+
+
+def shard_of(key, n_shards):
+    # crc32 rather than hash(), which is salted per process and so would
+    # disagree between the coordinator and the shards
+    return zlib.crc32(key.encode("utf-8")) % n_shards
+
+
+def _key_position(extra_columns, shard_column):
+    # Rows are name, hours, then the extra columns
+    if shard_column is None:
+        return 0
+
+    return 2 + list(extra_columns).index(shard_column)
+
+
+def shard_rows(source, shard, n_shards, key_position=0):
+    # The rows of source belonging to one shard: by name hash, or by the
+    # value in key_position, e.g. a region column, so a region lives on a
+    # single shard
+    for row in rows(source):
+        if shard_of(row[key_position], n_shards) == shard:
+            yield row
+
+
+def _answer(index, request):
+    (operation, *args) = request
+
+    if operation == "len":
+        return len(index)
+
+    if operation == "open":
+        (search_datetime, limit, where) = args
+        if not where:
+            return index.open_restaurants(search_datetime, limit=limit)
+
+        names = (
+            index.name(restaurant_id)
+            for restaurant_id in index.open_ids(search_datetime)
+            if all(
+                index.columns(restaurant_id).get(column) == value
+                for (column, value) in where.items()
+            )
+        )
+        return list(itertools.islice(names, limit))
+
+    raise ValueError("Unknown shard request {!r}".format(operation))
+
+
+def _serve_connection(index, connection):
+    # Returns False once told to stop
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return True
+
+        if request == ("stop",):
+            connection.send(("ok", None))
+            return False
+
+        try:
+            connection.send(("ok", _answer(index, request)))
+        except Exception as e:
+            connection.send(("error", e))
+
+
+def serve_shard(
+    source,
+    address,
+    authkey,
+    shard=0,
+    n_shards=1,
+    extra_columns=(),
+    shard_column=None,
+    ready=None
+):
+    # Loads one shard of source and answers queries on address until a
+    # coordinator says stop. Runs in a worker process from start_shards(),
+    # or on another node with a (host, port) address the coordinators can
+    # reach. Coordinators are served one connection at a time.
+    index = load_index(
+        shard_rows(
+            source,
+            shard,
+            n_shards,
+            _key_position(extra_columns, shard_column)
+        ),
+        extra_columns
+    )
+
+    with Listener(address, authkey=authkey) as listener:
+        # Port 0 picks a free port, so report the one actually bound
+        if ready is not None:
+            ready.send(listener.address)
+            ready.close()
+
+        while True:
+            with listener.accept() as connection:
+                if not _serve_connection(index, connection):
+                    return
+
+
+class ShardedIndex:
+    # Coordinator: fans each query out to every shard and merges their
+    # alphabetical results. Restaurants whose names only differ in case
+    # across shards come out in shard order rather than CSV order.
+    # addresses are in shard order, so regions route to the right shard.
+    def __init__(
+        self,
+        addresses,
+        authkey,
+        shard_column=None,
+        processes=()
+    ):
+        self.shard_column = shard_column
+        self._connections = [
+            Client(address, authkey=authkey)
+            for address in addresses
+        ]
+        # Shards this coordinator started, and so stops on close()
+        self._processes = list(processes)
+        # One query in flight per connection
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(self._scatter(("len",), self._connections))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def n_shards(self):
+        return len(self._connections)
+
+    def _scatter(self, request, connections):
+        # Send to every shard before waiting on any, so they all work at
+        # once
+        with self._lock:
+            for connection in connections:
+                connection.send(request)
+            replies = [connection.recv() for connection in connections]
+
+        for (status, value) in replies:
+            if status == "error":
+                raise value
+
+        return [value for (_, value) in replies]
+
+    def open_restaurants(
+        self,
+        search_datetime,
+        offset=0,
+        limit=None,
+        region=None
+    ):
+        start = perf_counter()
+
+        if region is None:
+            connections = self._connections
+            where = None
+        else:
+            # Only the region's shard can have any
+            assert self.shard_column is not None, \
+                "Regions need shards split by a column"
+            connections = [
+                self._connections[shard_of(region, self.n_shards)]
+            ]
+            where = {self.shard_column: region}
+
+        # A page can't need more than its end from any one shard
+        end = None if limit is None else offset + limit
+        results = self._scatter(
+            ("open", search_datetime, end, where),
+            connections
+        )
+
+        open_restaurants = list(itertools.islice(
+            heapq.merge(*results, key=str.casefold),
+            offset,
+            end
+        ))
+
+        _SHARDED_QUERY_SECONDS.observe(perf_counter() - start)
+        return open_restaurants
+
+    def close(self):
+        for connection in self._connections:
+            if self._processes:
+                connection.send(("stop",))
+                connection.recv()
+            connection.close()
+
+        for process in self._processes:
+            process.join()
+
+
+def start_shards(
+    source,
+    n_shards,
+    extra_columns=(),
+    shard_column=None,
+    host="localhost"
+):
+    # One worker process per shard, each loading and parsing its own share
+    # of source in parallel
+    authkey = os.urandom(32)
+    processes = []
+    receivers = []
+
+    for shard in range(n_shards):
+        (receiver, sender) = Pipe(duplex=False)
+        process = Process(
+            target=serve_shard,
+            args=(
+                source,
+                (host, 0),
+                authkey,
+                shard,
+                n_shards,
+                extra_columns,
+                shard_column,
+                sender
+            ),
+            daemon=True
+        )
+        process.start()
+        sender.close()
+
+        processes.append(process)
+        receivers.append(receiver)
+
+    addresses = []
+    for receiver in receivers:
+        with receiver:
+            addresses.append(receiver.recv())
+
+    return ShardedIndex(addresses, authkey, shard_column, processes)
+
+
+def _test_shard_rows():
+    all_rows = list(rows("rest_hours.csv"))
+    shards = [list(shard_rows(all_rows, shard, 3)) for shard in range(3)]
+
+    # Every row lands in exactly one shard, in source order
+    assert sorted(itertools.chain(*shards)) == sorted(all_rows)
+    assert all(
+        shard_rows_read == [row for row in all_rows if row in shard_rows_read]
+        for shard_rows_read in shards
+    )
+    assert all(shards)
+
+
+def _test_sharded_index():
+    from datetime import datetime, timedelta
+
+    index = load_index("rest_hours.csv")
+    search_datetimes = [
+        datetime(2020, 11, 16) + timedelta(minutes=minute)
+        for minute in range(0, 7*24*60, 97)
+    ]
+
+    with start_shards("rest_hours.csv", 3) as sharded:
+        assert sharded.n_shards == 3
+        assert len(sharded) == len(index)
+
+        for search_datetime in search_datetimes:
+            assert sharded.open_restaurants(search_datetime) == \
+                index.open_restaurants(search_datetime)
+
+        saturday = datetime(2020, 11, 14, 13, 45)
+        all_open = index.open_restaurants(saturday)
+        assert len(all_open) > 10
+        for offset in range(0, len(all_open) + 5, 4):
+            assert sharded.open_restaurants(saturday, offset, 4) == \
+                all_open[offset:offset + 4]
+
+        # Shard errors reach the coordinator, which stays usable
+        try:
+            sharded._scatter(("compact",), sharded._connections)
+            assert False, "Unknown requests should fail"
+        except ValueError as e:
+            assert "compact" in e.args[0]
+        assert len(sharded) == len(index)
+
+        processes = sharded._processes
+
+    assert all(process.exitcode == 0 for process in processes)
+
+    # Shards split by region answer region queries from one shard
+    regional_rows = [
+        row + ["north" if i % 3 else "south"]
+        for (i, row) in enumerate(rows("rest_hours.csv"))
+    ]
+    regional = load_index(regional_rows, ["area"])
+
+    with start_shards(regional_rows, 2, ["area"], "area") as sharded:
+        for search_datetime in search_datetimes[::5]:
+            assert sharded.open_restaurants(search_datetime) == \
+                regional.open_restaurants(search_datetime)
+
+            for area in ["north", "south", "east"]:
+                assert sharded.open_restaurants(
+                    search_datetime,
+                    region=area
+                ) == [
+                    regional.name(restaurant_id)
+                    for restaurant_id in regional.open_ids(search_datetime)
+                    if regional.columns(restaurant_id)["area"] == area
+                ]
+
+
+if __name__ == "__main__":
+    _test_shard_rows()
+    _test_sharded_index()
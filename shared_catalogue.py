@@ -0,0 +1,344 @@
+import functools
+import struct
+import threading
+from array import array
+from multiprocessing import shared_memory
+from datetime import datetime
+from find_open_restaurants import load_restaurants
+from restaurant_index import QUERY_CACHE_SIZE, minute_of_week
+
+
+SECONDS_PER_WEEK = 7*24*60*60
+
+# Magic, restaurant count, interval count, name table size in bytes
+_HEADER = struct.Struct("<4sIII")
+_MAGIC = b"RCAT"
+
+
+def _catalogue_arrays(restaurants):
+    # Same order as RestaurantIndex: alphabetical, same-named restaurants
+    # in CSV order
+    restaurants = sorted(
+        restaurants,
+        key=lambda rest: rest["name"].casefold()
+    )
+
+    interval_offsets = array("I", [0])
+    opens = array("I")
+    closes = array("I")
+    name_offsets = array("I", [0])
+    names = bytearray()
+
+    for rest in restaurants:
+        for hour_range in rest["hours_datetimes"]:
+            opens.append(int(hour_range["open_datetime"]))
+            closes.append(int(hour_range["close_datetime"]))
+        interval_offsets.append(len(opens))
+
+        names += rest["name"].encode("utf-8")
+        name_offsets.append(len(names))
+
+    return (interval_offsets, opens, closes, name_offsets, bytes(names))
+
+
+def _layout(n_restaurants, n_intervals):
+    # Byte offsets of each table. Every uint32 table starts 4-byte aligned
+    # because the header is 16 bytes and the tables before it are uint32.
+    interval_offsets = _HEADER.size
+    opens = interval_offsets + 4*(n_restaurants + 1)
+    closes = opens + 4*n_intervals
+    name_offsets = closes + 4*n_intervals
+    names = name_offsets + 4*(n_restaurants + 1)
+
+    return (interval_offsets, opens, closes, name_offsets, names)
+
+
+# Held while _attach has resource_tracker.register patched out, and while
+# publishing a segment, so neither another attach nor the loader's own
+# registration can run against the patch from another thread
+_TRACKER_LOCK = threading.Lock()
+
+
+def _attach(name):
+    try:
+        # Python 3.13+: attaching workers must not unlink on exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    # Older Pythons register every attachment with the resource tracker,
+    # which would unlink the loader's segment when a worker exits. Workers
+    # forked from the loader share its tracker, so unregistering afterwards
+    # would drop the loader's own registration instead.
+    from multiprocessing import resource_tracker
+
+    with _TRACKER_LOCK:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedCatalogue:
+    def __init__(self, shm, owner, cache_size=QUERY_CACHE_SIZE):
+        self._shm = shm
+        self.owner = owner
+
+        buf = shm.buf.toreadonly()
+        (magic, n_restaurants, n_intervals, names_size) = \
+            _HEADER.unpack_from(buf)
+        assert magic == _MAGIC, "Not a restaurant catalogue"
+
+        (interval_offsets, opens, closes, name_offsets, names) = \
+            _layout(n_restaurants, n_intervals)
+
+        # Views straight into the segment; nothing is copied per worker
+        self._buf = buf
+        self._interval_offsets = buf[interval_offsets:opens].cast("I")
+        self._opens = buf[opens:closes].cast("I")
+        self._closes = buf[closes:name_offsets].cast("I")
+        self._name_offsets = buf[name_offsets:names].cast("I")
+        self._names = buf[names:names + names_size]
+        self._n_restaurants = n_restaurants
+
+        self._open_at_minute = functools.lru_cache(maxsize=cache_size)(
+            self._evaluate_minute
+        )
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def __len__(self):
+        return self._n_restaurants
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def restaurant_name(self, restaurant_id):
+        return str(
+            self._names[
+                self._name_offsets[restaurant_id]:
+                self._name_offsets[restaurant_id + 1]
+            ],
+            "utf-8"
+        )
+
+    def names(self):
+        return [self.restaurant_name(i) for i in range(len(self))]
+
+    def open_restaurants(self, search_datetime):
+        return [
+            self.restaurant_name(i)
+            for i in self._open_at_minute(minute_of_week(search_datetime))
+        ]
+
+    def _evaluate_minute(self, minute):
+        current = minute*60
+        opens = self._opens
+        closes = self._closes
+        offsets = self._interval_offsets
+        open_ids = []
+
+        for restaurant_id in range(self._n_restaurants):
+            for i in range(offsets[restaurant_id], offsets[restaurant_id + 1]):
+                # datetime_in_range on plain seconds
+                if (current - opens[i]) % SECONDS_PER_WEEK \
+                        < (closes[i] - opens[i]) % SECONDS_PER_WEEK:
+                    open_ids.append(restaurant_id)
+                    break
+
+        return tuple(open_ids)
+
+    def close(self):
+        # Views must go before the segment can be closed
+        self._open_at_minute.cache_clear()
+        for view in [
+            self._interval_offsets,
+            self._opens,
+            self._closes,
+            self._name_offsets,
+            self._names,
+            self._buf
+        ]:
+            view.release()
+        self._shm.close()
+
+    def unlink(self):
+        assert self.owner, "Only the loader that published may unlink"
+        self._shm.unlink()
+
+
+def publish_catalogue(restaurants, name=None):
+    (interval_offsets, opens, closes, name_offsets, names) = \
+        _catalogue_arrays(restaurants)
+    n_restaurants = len(name_offsets) - 1
+    layout = _layout(n_restaurants, len(opens))
+    size = layout[-1] + len(names)
+
+    with _TRACKER_LOCK:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    try:
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, n_restaurants, len(opens),
+                          len(names))
+        for (offset, table) in zip(
+            layout,
+            [interval_offsets, opens, closes, name_offsets, names]
+        ):
+            table = bytes(table)
+            shm.buf[offset:offset + len(table)] = table
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+
+    return SharedCatalogue(shm, owner=True)
+
+
+def publish_csv(csv_filename, name=None):
+    return publish_catalogue(load_restaurants(csv_filename), name)
+
+
+def attach_catalogue(name):
+    return SharedCatalogue(_attach(name), owner=False)
+
+
+def _worker_query(args):
+    (name, search_datetimes) = args
+
+    with attach_catalogue(name) as catalogue:
+        return [
+            catalogue.open_restaurants(search_datetime)
+            for search_datetime in search_datetimes
+        ]
+
+
+def _test_shared_catalogue():
+    from multiprocessing import Pool
+    from restaurant_index import RestaurantIndex
+
+    restaurants = load_restaurants("rest_hours.csv")
+    index = RestaurantIndex(restaurants)
+    search_datetimes = [
+        datetime(2020, 11, day, hour, 30)
+        for day in range(16, 23)
+        for hour in [0, 9, 13, 21]
+    ]
+    expected = [
+        index.open_restaurants(search_datetime)
+        for search_datetime in search_datetimes
+    ]
+
+    catalogue = publish_catalogue(restaurants)
+    try:
+        assert len(catalogue) == len(index)
+        assert catalogue.names() == index.names()
+
+        # Workers attach by name and see the loader's catalogue
+        with Pool(2) as pool:
+            results = pool.map(
+                _worker_query,
+                [(catalogue.name, search_datetimes)]*4
+            )
+        assert results == [expected]*4
+
+        # Workers exiting must not have removed the segment
+        with attach_catalogue(catalogue.name) as attached:
+            assert attached.open_restaurants(search_datetimes[0]) == \
+                expected[0]
+
+            # Attachments are read-only
+            try:
+                attached._opens[0] = 0
+                assert False, "Catalogue should be read-only"
+            except TypeError:
+                pass
+
+            try:
+                attached.unlink()
+                assert False, "Workers should not unlink"
+            except AssertionError as e:
+                assert "loader" in e.args[0]
+    finally:
+        catalogue.close()
+        catalogue.unlink()
+
+    try:
+        attach_catalogue(catalogue.name)
+        assert False, "Segment should be gone after unlink"
+    except FileNotFoundError:
+        pass
+
+
+def _test_unicode_names():
+    from find_open_restaurants import parse_restaurant
+
+    restaurants = [
+        parse_restaurant("Café Ümlaut", "Mon 9 am - 5 pm"),
+        parse_restaurant("", "Tue 9 am - 5 pm"),
+        parse_restaurant("Bar", "Sun 11 pm - 2 am")
+    ]
+
+    with publish_catalogue(restaurants) as catalogue:
+        try:
+            assert catalogue.names() == ["", "Bar", "Café Ümlaut"]
+            # Wraps from Sunday into Monday
+            assert catalogue.open_restaurants(
+                datetime(2020, 11, 16, 1, 0)
+            ) == ["Bar"]
+        finally:
+            catalogue.unlink()
+
+
+def _test_concurrent_attach():
+    import sys
+    from multiprocessing import resource_tracker
+
+    register = resource_tracker.register
+    restaurants = load_restaurants("rest_hours.csv")
+    errors = []
+
+    with publish_catalogue(restaurants) as catalogue:
+        try:
+            def attach_repeatedly():
+                try:
+                    for _ in range(50):
+                        attach_catalogue(catalogue.name).close()
+                except BaseException as e:
+                    errors.append(e)
+
+            # Switch threads as often as possible to give races a chance
+            switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+            try:
+                threads = [
+                    threading.Thread(target=attach_repeatedly)
+                    for _ in range(8)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                sys.setswitchinterval(switch_interval)
+        finally:
+            catalogue.unlink()
+
+    # Racing patches would leave the no-op in place of the real register
+    assert errors == []
+    assert resource_tracker.register is register
+
+
+if __name__ == "__main__":
+    _test_shared_catalogue()
+    _test_unicode_names()
+    _test_concurrent_attach()